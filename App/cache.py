@@ -0,0 +1,130 @@
+import io
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from hashlib import blake2b
+
+from PIL import Image
+from tinytag import TinyTag
+
+from App.database import ArtworkDao, TrackDao
+from App.image import find_average_color, load_cover, default_artwork
+from App.tracing import span
+
+MEMORY_CAPACITY = 32  # decoded covers kept in memory
+DISK_LIMIT = 64 * 1024 * 1024  # bytes of encoded thumbnails kept in the database
+
+Track = namedtuple('Track', 'file_path mtime size title artist album genre year duration artwork')
+
+
+def artwork_key(data: bytes):
+    """Content address of embedded artwork, equal for every track of an album"""
+    return blake2b(data, digest_size=16).hexdigest()
+
+
+class ArtworkCache:
+    """Scaled covers and their theme colors: an in-memory LRU in front of the artwork table.
+
+    Safe to share between the GUI thread and prefetch workers.
+    """
+
+    def __init__(self, capacity=MEMORY_CAPACITY, disk_limit=DISK_LIMIT):
+        self.capacity = capacity
+        self.disk_limit = disk_limit
+        self.dao = ArtworkDao()
+        self.items = OrderedDict()
+        self.lock = threading.RLock()
+
+    def get(self, data):
+        """Returns (cover, color) for embedded artwork bytes, decoding them only on a full miss"""
+        if data is None:
+            return default_artwork()
+
+        with span('artwork.hash'):
+            key = artwork_key(data)
+        entry = self.lookup(key)
+        if entry is None:
+            with span('artwork.decode_resize'):
+                cover = load_cover(data)
+            with span('artwork.average_color'):
+                entry = cover, find_average_color(cover)
+            self.store(key, *entry)
+            self.remember(key, entry)
+        return entry
+
+    def lookup(self, key):
+        """Returns (cover, color) for an artwork key, or None if it is not cached"""
+        with self.lock:
+            if key in self.items:
+                self.items.move_to_end(key)
+                return self.items[key]
+            row = self.dao.get(key)
+            if row is None:
+                return None
+            self.dao.touch(key, time.time())
+
+        with span('artwork.png_read'):
+            cover = Image.open(io.BytesIO(row[0]))
+            cover.load()
+        entry = cover, list(row[1:])
+        self.remember(key, entry)
+        return entry
+
+    def remember(self, key, entry):
+        with self.lock:
+            self.items[key] = entry
+            self.items.move_to_end(key)
+            while len(self.items) > self.capacity:
+                self.items.popitem(last=False)
+
+    def store(self, key, cover, color):
+        buffer = io.BytesIO()
+        with span('artwork.png_write'):
+            cover.save(buffer, 'PNG')
+        with self.lock:
+            self.dao.save(key, buffer.getvalue(), color, time.time())
+            if self.dao.total_size() > self.disk_limit:
+                self.dao.evict(self.disk_limit)
+
+
+class TrackCache:
+    """Parsed tags from the track table, revalidated by mtime and size of the file"""
+
+    def __init__(self, artwork_cache=None):
+        self.dao = TrackDao()
+        self.artwork_cache = artwork_cache
+
+    def get(self, file_path):
+        stat = os.stat(file_path)
+        row = self.dao.get(file_path)
+        if row is not None:
+            track = Track(*row)
+            if track.mtime == stat.st_mtime_ns and track.size == stat.st_size:
+                return track
+
+        with span('tags.parse'):
+            tag = TinyTag.get(file_path, image=True)
+        image = tag.get_image()
+        artwork = None if image is None else artwork_key(image)
+        if artwork is not None and self.artwork_cache is not None:
+            # the cover is needed right away, so decode it into the cache while the bytes are at hand
+            self.artwork_cache.get(image)
+
+        track = Track(file_path, stat.st_mtime_ns, stat.st_size, tag.title, tag.artist, tag.album, tag.genre,
+                      tag.year, tag.duration, artwork)
+        self.dao.save(*track)
+        return track
+
+    def forget(self, file_paths):
+        """Drops cached tags of files that were removed from disk"""
+        self.dao.delete_many(file_paths)
+
+    def artwork(self, track):
+        """Returns (cover, color) of the track, reading the file again only if the cover was evicted"""
+        if track.artwork is None:
+            return self.artwork_cache.get(None)
+        entry = self.artwork_cache.lookup(track.artwork)
+        if entry is None:
+            entry = self.artwork_cache.get(TinyTag.get(track.file_path, image=True).get_image())
+        return entry
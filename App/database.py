@@ -1,6 +1,19 @@
+import os
 import sqlite3
+import threading
+from itertools import islice
+
+from App.tracing import traced
 
 db_path = 'App/audioplayer.db'
+BUSY_TIMEOUT = 5.0  # seconds a statement waits for a lock held by another connection
+STATEMENT_CACHE_SIZE = 256  # prepared statements kept per connection
+BATCH_SIZE = 5000  # rows passed to one executemany when inserting from a stream
+MIGRATIONS_PATH = 'App/resources/db/migrations'  # NNN_name.sql, applied in order of NNN
+
+thread_data = threading.local()
+migrated = set()  # database paths brought up to date by this process
+migration_lock = threading.Lock()
 
 
 class SongException(Exception):
@@ -8,45 +21,308 @@ class SongException(Exception):
     pass
 
 
-class UserDao:
-    def __init__(self):
-        self.con = sqlite3.connect(db_path)
-        self.cur = self.con.cursor()
+class PlaylistException(Exception):
+    """The user already has a playlist with this name"""
+    pass
+
+
+def get_connection():
+    """Returns the calling thread's connection to db_path, opening and tuning it on first use.
+
+    Every DAO runs its statements here, so the process keeps one connection per thread
+    instead of one per DAO instance. WAL lets the GUI read while a worker commits.
+    """
+    connections = thread_data.__dict__.setdefault('connections', {})
+    con = connections.get(db_path)
+    if con is None:
+        con = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT, cached_statements=STATEMENT_CACHE_SIZE)
+        con.execute('PRAGMA journal_mode = WAL')
+        con.execute('PRAGMA synchronous = NORMAL')
+        with migration_lock:
+            if db_path not in migrated:
+                migrate(con)
+                migrated.add(db_path)
+        connections[db_path] = con
+    return con
+
+
+def migrate(con):
+    """Applies the scripts in MIGRATIONS_PATH newer than the user_version of the database.
 
+    Every script runs in one transaction together with its version bump, so a database
+    from any earlier release, or a new empty file, is brought up to date step by step.
+    """
+    version = con.execute('PRAGMA user_version').fetchone()[0]
+    for name in sorted(os.listdir(MIGRATIONS_PATH)):
+        prefix = name.split('_', 1)[0]
+        if not name.endswith('.sql') or not prefix.isdecimal():  # a README, editor backup or .DS_Store
+            continue
+        number = int(prefix)
+        if number <= version:
+            continue
+        with open(os.path.join(MIGRATIONS_PATH, name)) as script:
+            try:
+                con.executescript(f'BEGIN;\n{script.read()}\nPRAGMA user_version = {number};\nCOMMIT;')
+            except sqlite3.Error:
+                con.rollback()
+                raise
+
+
+class Dao:
+    @property
+    def con(self):
+        return get_connection()
+
+
+@traced
+class UserDao(Dao):
     def save(self, name, login, password):
         query = 'INSERT INTO user(name, login, password) VALUES (?, ?, ?)'
-        self.cur.execute(query, (name, login, password))
+        self.con.execute(query, (name, login, password))
         self.con.commit()
 
     def get(self, login):
         query = 'SELECT * FROM user WHERE login = ?'
-        user = self.cur.execute(query, (login,)).fetchone()
+        user = self.con.execute(query, (login,)).fetchone()
         return user
 
 
-class AudiofileDao:
-    def __init__(self):
-        self.con = sqlite3.connect(db_path)
-        self.cur = self.con.cursor()
+@traced
+class AudiofileDao(Dao):
+    INSERT = 'INSERT INTO audiofile(user_id, title, author, file_path) VALUES (?, ?, ?, ?) ' \
+             'ON CONFLICT (user_id, file_path) DO NOTHING'
 
     def save(self, user_id, title, author, file_path):
-        query = 'SELECT id, title, author, file_path FROM audiofile WHERE user_id = ? AND file_path = ?'
-        track = self.cur.execute(query, (user_id, file_path)).fetchone()
-        if track is not None:
+        inserted = self.con.execute(self.INSERT, (user_id, title, author, file_path)).rowcount
+        self.con.commit()
+        if inserted == 0:
             raise SongException
 
-        query = 'INSERT INTO audiofile(user_id, title, author, file_path) VALUES (?, ?, ?, ?)'
+    def save_many(self, user_id, songs):
+        """Adds (title, author, file_path) songs in one transaction, skipping ones already in favorites"""
+        changes = self.con.total_changes
+        self.con.executemany(self.INSERT, ((user_id, title, author, file_path) for title, author, file_path in songs))
+        self.con.commit()
+        return self.con.total_changes - changes
+
+    def toggle(self, user_id, title, author, file_path):
+        """Adds the song to favorites or removes it, returns True if it is liked afterwards"""
         try:
-            self.cur.execute(query, (user_id, title, author, file_path))
-            self.con.commit()
-        except sqlite3.IntegrityError:
-            pass
+            self.save(user_id, title, author, file_path)
+            return True
+        except SongException:
+            self.delete(user_id, file_path)
+            return False
 
     def get_all(self, user_id):
         query = 'SELECT id, title, author, file_path FROM audiofile WHERE user_id = ?'
-        return self.cur.execute(query, (user_id,)).fetchall()
+        return self.con.execute(query, (user_id,)).fetchall()
+
+    def count(self, user_id):
+        query = 'SELECT COUNT(*) FROM audiofile WHERE user_id = ?'
+        return self.con.execute(query, (user_id,)).fetchone()[0]
+
+    @staticmethod
+    def sort_key(order_by):
+        """SQL expression the favorites are sorted by, 'title', 'author' or None for the order they were added in"""
+        return {'title': 'title COLLATE NOCASE', 'author': 'author COLLATE NOCASE'}.get(order_by, 'id')
+
+    def get_page(self, user_id, order_by, descending, limit, after=None, offset=0):
+        """Returns a page of favorites sorted like get_paths, starting after the (sort value, id) of a row.
+
+        Seeking to the row through the sort index costs the same however deep the page is, only
+        the offset rows past it are scanned.
+        """
+        column = self.sort_key(order_by)
+        direction, compare = ('DESC', '<') if descending else ('ASC', '>')
+        # spelled out rather than as a row value, which SQLite can't seek the index with
+        seek = '' if after is None else f'AND {column} {compare}= ? AND ({column} {compare} ? OR id {compare} ?) '
+        query = f'SELECT id, title, author, file_path FROM audiofile WHERE user_id = ? {seek}' \
+                f'ORDER BY {column} {direction}, id {direction} LIMIT ? OFFSET ?'
+        values = () if after is None else (after[0], after[0], after[1])
+        return self.con.execute(query, (user_id, *values, limit, offset)).fetchall()
+
+    def get_paths(self, user_id, order_by, descending):
+        """Returns the file paths of all favorites in the order the favorites list shows them"""
+        direction = 'DESC' if descending else 'ASC'
+        query = f'SELECT file_path FROM audiofile WHERE user_id = ? ' \
+                f'ORDER BY {self.sort_key(order_by)} {direction}, id {direction}'
+        return [row[0] for row in self.con.execute(query, (user_id,))]
+
+    def is_liked(self, user_id, file_path):
+        """Single lookup in the UNIQUE(user_id, file_path) index, independent of the favorites count"""
+        query = 'SELECT 1 FROM audiofile WHERE user_id = ? AND file_path = ?'
+        return self.con.execute(query, (user_id, file_path)).fetchone() is not None
+
+    def delete(self, user_id, path):
+        query = 'DELETE FROM audiofile WHERE user_id = ? AND file_path = ?'
+        self.con.execute(query, (user_id, path))
+        self.con.commit()
+
+    def delete_many(self, user_id, paths):
+        query = 'DELETE FROM audiofile WHERE user_id = ? AND file_path = ?'
+        self.con.executemany(query, ((user_id, path) for path in paths))
+        self.con.commit()
+
+    def delete_all_for_user(self, user_id):
+        query = 'DELETE FROM audiofile WHERE user_id = ?'
+        self.con.execute(query, (user_id,))
+        self.con.commit()
+
+
+@traced
+class PlaylistDao(Dao):
+    def create(self, user_id, name):
+        query = 'INSERT INTO playlist(user_id, name) VALUES (?, ?) ON CONFLICT (user_id, name) DO NOTHING'
+        cursor = self.con.execute(query, (user_id, name))
+        self.con.commit()
+        if cursor.rowcount == 0:
+            raise PlaylistException
+        return cursor.lastrowid
+
+    def save_as(self, user_id, name, file_paths):
+        """Stores file paths as the user's playlist called name, replacing its entries if it exists"""
+        query = 'INSERT INTO playlist(user_id, name) VALUES (?, ?) ON CONFLICT (user_id, name) DO NOTHING'
+        self.con.execute(query, (user_id, name))
+        query = 'SELECT id FROM playlist WHERE user_id = ? AND name = ?'
+        playlist_id = self.con.execute(query, (user_id, name)).fetchone()[0]
+        return self.save(playlist_id, file_paths)
 
-    def delete(self, path):
-        query = 'DELETE FROM audiofile WHERE file_path = ?'
-        self.cur.execute(query, (path,))
+    def get_all(self, user_id):
+        """Returns (id, name, entry count) of the user's playlists, ordered by name"""
+        query = 'SELECT id, name, (SELECT COUNT(*) FROM playlist_entry WHERE playlist_id = playlist.id) ' \
+                'FROM playlist WHERE user_id = ? ORDER BY name COLLATE NOCASE'
+        return self.con.execute(query, (user_id,)).fetchall()
+
+    def append(self, playlist_id, file_paths, commit=True):
+        """Adds file paths from any iterable after the last entry, BATCH_SIZE rows per statement"""
+        query = 'SELECT COALESCE(MAX(position) + 1, 0) FROM playlist_entry WHERE playlist_id = ?'
+        position = start = self.con.execute(query, (playlist_id,)).fetchone()[0]
+        query = 'INSERT INTO playlist_entry(playlist_id, position, file_path) VALUES (?, ?, ?)'
+        file_paths = iter(file_paths)
+        while True:
+            batch = [(playlist_id, position + i, file_path) for i, file_path in
+                     enumerate(islice(file_paths, BATCH_SIZE))]
+            if not batch:
+                break
+            self.con.executemany(query, batch)
+            position += len(batch)
+        if commit:
+            self.con.commit()
+        return position - start
+
+    def save(self, playlist_id, file_paths):
+        """Replaces all entries of the playlist in one transaction"""
+        self.con.execute('DELETE FROM playlist_entry WHERE playlist_id = ?', (playlist_id,))
+        return self.append(playlist_id, file_paths)
+
+    def entries(self, playlist_id):
+        """Yields the file paths of the playlist in order, without fetching them all at once"""
+        query = 'SELECT file_path FROM playlist_entry WHERE playlist_id = ? ORDER BY position'
+        for file_path, in self.con.execute(query, (playlist_id,)):
+            yield file_path
+
+    def delete(self, playlist_id):
+        self.con.execute('DELETE FROM playlist_entry WHERE playlist_id = ?', (playlist_id,))
+        self.con.execute('DELETE FROM playlist WHERE id = ?', (playlist_id,))
+        self.con.commit()
+
+
+@traced
+class ArtworkDao(Dao):
+    def save(self, key, image, color, last_used):
+        query = 'INSERT OR REPLACE INTO artwork(hash, image, red, green, blue, size, last_used) ' \
+                'VALUES (?, ?, ?, ?, ?, ?, ?)'
+        self.con.execute(query, (key, image, *color, len(image), last_used))
+        self.con.commit()
+
+    def get(self, key):
+        query = 'SELECT image, red, green, blue FROM artwork WHERE hash = ?'
+        return self.con.execute(query, (key,)).fetchone()
+
+    def save_many(self, rows, commit=True):
+        """Stores (key, image, color, last_used) rows, keeping artwork that is already stored"""
+        query = 'INSERT OR IGNORE INTO artwork(hash, image, red, green, blue, size, last_used) ' \
+                'VALUES (?, ?, ?, ?, ?, ?, ?)'
+        self.con.executemany(query, ((key, image, *color, len(image), last_used)
+                                     for key, image, color, last_used in rows))
+        if commit:
+            self.con.commit()
+
+    def get_keys(self):
+        return [row[0] for row in self.con.execute('SELECT hash FROM artwork')]
+
+    def touch(self, key, last_used):
+        query = 'UPDATE artwork SET last_used = ? WHERE hash = ?'
+        self.con.execute(query, (last_used, key))
+        self.con.commit()
+
+    def total_size(self):
+        query = 'SELECT COALESCE(SUM(size), 0) FROM artwork'
+        return self.con.execute(query).fetchone()[0]
+
+    def evict(self, limit):
+        """Deletes least recently used artwork until the store fits into limit bytes"""
+        query = 'SELECT hash, size FROM artwork ORDER BY last_used'
+        excess = self.total_size() - limit
+        stale = []
+        for key, size in self.con.execute(query).fetchall():
+            if excess <= 0:
+                break
+            stale.append((key,))
+            excess -= size
+        self.con.executemany('DELETE FROM artwork WHERE hash = ?', stale)
+        self.con.commit()
+        return [key for key, in stale]
+
+
+@traced
+class TrackDao(Dao):
+    # an upsert rather than INSERT OR REPLACE, so that the search index triggers see an UPDATE
+    UPSERT = 'INSERT INTO track(file_path, mtime, size, title, artist, album, genre, year, duration, artwork) ' \
+             'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (file_path) DO UPDATE SET mtime = excluded.mtime, ' \
+             'size = excluded.size, title = excluded.title, artist = excluded.artist, album = excluded.album, ' \
+             'genre = excluded.genre, year = excluded.year, duration = excluded.duration, artwork = excluded.artwork'
+
+    def save(self, file_path, mtime, size, title, artist, album, genre, year, duration, artwork):
+        self.con.execute(self.UPSERT, (file_path, mtime, size, title, artist, album, genre, year, duration, artwork))
+        self.con.commit()
+
+    def save_many(self, tracks):
+        """Upserts rows in the column order of save() in one transaction"""
+        self.con.executemany(self.UPSERT, tracks)
         self.con.commit()
+
+    def get(self, file_path):
+        query = 'SELECT file_path, mtime, size, title, artist, album, genre, year, duration, artwork ' \
+                'FROM track WHERE file_path = ?'
+        return self.con.execute(query, (file_path,)).fetchone()
+
+    def get_versions(self, prefix):
+        """Returns {file_path: (mtime, size)} of the tracks whose path starts with prefix, a range scan of the key"""
+        query = 'SELECT file_path, mtime, size FROM track WHERE file_path >= ? AND file_path < ?'
+        rows = self.con.execute(query, (prefix, prefix + '\U0010ffff'))
+        return {file_path: (mtime, size) for file_path, mtime, size in rows}
+
+    def delete(self, file_path):
+        query = 'DELETE FROM track WHERE file_path = ?'
+        self.con.execute(query, (file_path,))
+        self.con.commit()
+
+    def delete_many(self, file_paths):
+        query = 'DELETE FROM track WHERE file_path = ?'
+        self.con.executemany(query, [(file_path,) for file_path in file_paths])
+        self.con.commit()
+
+    def search(self, text, limit):
+        """Tracks where every word of text is a prefix of a title, artist, album or file name word.
+
+        Results come in index order: ranking all matches of a short prefix costs hundreds of
+        milliseconds on a large library, while an unranked LIMIT stops at the first matches.
+        """
+        words = ['"' + word.replace('"', '""') + '"*' for word in text.split()]
+        if not words:
+            return []
+        query = 'SELECT track.file_path, track.title, track.artist, track.album FROM track_search ' \
+                'JOIN track ON track.rowid = track_search.rowid WHERE track_search MATCH ? LIMIT ?'
+        return self.con.execute(query, (' '.join(words), limit)).fetchall()
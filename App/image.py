@@ -1,27 +1,78 @@
 import io
+from functools import lru_cache
 
-from PIL import Image
-
-
-def find_average_color(image_path: str):
-    image = Image.open(image_path)
-    pixels = image.load()
-    x, y = image.size
-    r_sum, g_sum, b_sum = 0, 0, 0
-    for i in range(x):
-        for j in range(y):
-            r_sum += pixels[i, j][0]
-            g_sum += pixels[i, j][1]
-            b_sum += pixels[i, j][2]
-    square = x * y
-    result = [int(r_sum / square), int(g_sum / square), int(b_sum / square)]
+from PIL import Image, ImageStat
+from PyQt5.QtGui import QImage
+
+COVER_SIZE = (340, 340)
+SAMPLE_SIZE = 64  # side of the downscaled copy used for color averaging
+DEFAULT_IMAGE_PATH = 'App/resources/default.png'
+
+
+def find_average_color(image: Image.Image):
+    """Returns the average RGB color of the image, darkened if it is too bright"""
+    # for JPEG covers this makes the decoder skip straight to a reduced scale
+    image.draft('RGB', (SAMPLE_SIZE, SAMPLE_SIZE))
+
+    alpha = has_alpha(image)
+    sample = image.convert('RGBA' if alpha else 'RGB')
+    if sample.width > SAMPLE_SIZE or sample.height > SAMPLE_SIZE:
+        # box filter averages whole areas, so the mean of the sample equals the mean of the original
+        sample = sample.resize((SAMPLE_SIZE, SAMPLE_SIZE), Image.BOX)
+
+    mask = None
+    if alpha:
+        mask = sample.getchannel('A')
+        sample = sample.convert('RGB')
+        if mask.getbbox() is None:  # fully transparent image
+            mask = None
+    stat = ImageStat.Stat(sample, mask)
+
+    return darken_color([int(channel) for channel in stat.mean])
+
+
+def darken_color(color):
+    """Darkens bright channels, so that white text stays readable"""
+    result = list(color)
     for i in range(3):
         if result[i] > 170 and sum(result) > 510:
             result[i] -= 50
     return result
 
 
-def save_audio_image(image: str):
-    img = Image.open(io.BytesIO(image))
-    img = img.resize((340, 340))
-    img.save('App/resources/temp.png')
+def has_alpha(image: Image.Image):
+    return image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+
+
+def load_cover(data: bytes):
+    """Decodes embedded artwork bytes and scales them to the cover size, without touching disk"""
+    try:
+        image = Image.open(io.BytesIO(data))
+        image.draft('RGB', COVER_SIZE)
+        image = image.convert('RGBA' if has_alpha(image) else 'RGB')
+    except OSError:
+        return default_cover()
+    return image.resize(COVER_SIZE)
+
+
+@lru_cache(maxsize=1)
+def default_cover():
+    """Cover for tracks without artwork, decoded once per process"""
+    image = Image.open(DEFAULT_IMAGE_PATH)
+    image.load()
+    return image
+
+
+@lru_cache(maxsize=1)
+def default_artwork():
+    """(cover, color) for tracks without artwork, the color is averaged once per process"""
+    cover = default_cover()
+    return cover, tuple(find_average_color(cover))
+
+
+def to_qimage(image: Image.Image):
+    """Wraps an RGB or RGBA image into a QImage that owns a copy of the pixels"""
+    fmt = QImage.Format_RGBA8888 if image.mode == 'RGBA' else QImage.Format_RGB888
+    channels = 4 if image.mode == 'RGBA' else 3
+    data = image.tobytes()
+    return QImage(data, image.width, image.height, image.width * channels, fmt).copy()
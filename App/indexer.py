@@ -0,0 +1,196 @@
+import argparse
+import io
+import os
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from tinytag import TinyTag
+from tinytag.tinytag import TinyTagException
+
+import App.database
+from App.cache import DISK_LIMIT, Track, artwork_key
+from App.database import ArtworkDao, TrackDao
+from App.image import find_average_color, load_cover
+from App.scanner import walk
+
+BATCH_SIZE = 500  # tracks written per transaction, an interrupted run loses at most this many
+CHUNK_SIZE = 32  # files sent to a worker process at once
+PROGRESS_INTERVAL = 0.5  # seconds between two progress lines
+
+seen_artwork = set()  # artwork keys this worker process has already thumbnailed or found in the database
+
+
+def init_worker(known_artwork):
+    seen_artwork.update(known_artwork)
+
+
+def read_track(file_path, mtime, size):
+    """Parses the tags of a file into a track row, returns (track, embedded artwork bytes or None)"""
+    tag = TinyTag.get(file_path, image=True)
+    image = tag.get_image()
+    key = None if image is None else artwork_key(image)
+    track = Track(file_path, mtime, size, tag.title, tag.artist, tag.album, tag.genre, tag.year, tag.duration, key)
+    return track, image
+
+
+def parse(file):
+    """Runs in a worker process: returns (track row, artwork row or None), or None if the file can't be read"""
+    try:
+        track, image = read_track(*file)
+    except (TinyTagException, OSError, ValueError, struct.error):
+        return None
+    key = track.artwork
+    artwork = None
+    if key is not None and key not in seen_artwork:
+        seen_artwork.add(key)
+        try:
+            cover = load_cover(image)
+            color = find_average_color(cover)
+            buffer = io.BytesIO()
+            cover.save(buffer, 'PNG')
+            artwork = key, buffer.getvalue(), color
+        except OSError:  # unreadable image data, the player falls back to the default cover for it too
+            pass
+    return tuple(track), artwork
+
+
+class Indexer:
+    """Parses the tags and artwork of a whole folder tree into the track and artwork tables.
+
+    Parsing runs in a pool of processes, the results are written here in batched transactions.
+    Files whose mtime and size match their track row are skipped, so an interrupted run resumes
+    where it stopped and a rerun only reads what changed.
+    """
+
+    def __init__(self, folder_path, workers=None, batch_size=BATCH_SIZE, out=sys.stderr):
+        self.folder_path = os.path.abspath(folder_path)
+        self.workers = workers or os.cpu_count()
+        self.batch_size = batch_size
+        self.out = out
+        self.track_dao = TrackDao()
+        self.artwork_dao = ArtworkDao()
+        self.found = self.skipped = self.parsed = self.indexed = self.failed = self.covers = 0
+
+    def run(self):
+        start = time.perf_counter()
+        known = self.track_dao.get_versions(self.folder_path)
+        files = []
+        for _, entries in walk(self.folder_path):
+            for entry in entries:
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                self.found += 1
+                file = entry.path, stat.st_mtime_ns, stat.st_size
+                if known.get(entry.path) != file[1:]:
+                    files.append(file)
+        self.skipped = self.found - len(files)
+        self.report(f'{self.found} files found, {self.skipped} already indexed '
+                    f'in {time.perf_counter() - start:.1f} s', end='\n')
+        if not files:
+            return
+
+        start = time.perf_counter()
+        last_report = start
+        tracks, artwork = [], []
+        known_artwork = self.artwork_dao.get_keys()
+        with ProcessPoolExecutor(self.workers, initializer=init_worker, initargs=(known_artwork,)) as executor:
+            try:
+                for result in executor.map(parse, files, chunksize=CHUNK_SIZE):
+                    self.parsed += 1
+                    if result is None:
+                        self.failed += 1
+                        continue
+                    tracks.append(result[0])
+                    if result[1] is not None:
+                        artwork.append((*result[1], time.time()))
+                    if len(tracks) >= self.batch_size:
+                        self.write(tracks, artwork)
+                        tracks, artwork = [], []
+                    if time.perf_counter() - last_report >= PROGRESS_INTERVAL:
+                        last_report = time.perf_counter()
+                        self.progress(len(files), last_report - start)
+            except KeyboardInterrupt:
+                executor.shutdown(wait=False, cancel_futures=True)
+                self.write(tracks, artwork)
+                self.progress(len(files), time.perf_counter() - start, end='\n')
+                self.report('interrupted, run the same command again to resume', end='\n')
+                raise
+        self.write(tracks, artwork)
+        self.progress(len(files), time.perf_counter() - start, end='\n')
+
+        if self.artwork_dao.total_size() > DISK_LIMIT:
+            self.artwork_dao.evict(DISK_LIMIT)
+
+    def write(self, tracks, artwork):
+        """Stores a batch in one transaction, the artwork first so no committed track misses its cover"""
+        self.artwork_dao.save_many(artwork, commit=False)
+        self.track_dao.save_many(tracks)
+        self.indexed += len(tracks)
+        self.covers += len(artwork)
+
+    def progress(self, total, elapsed, end=''):
+        rate = self.parsed / elapsed if elapsed else 0.0
+        self.report(f'\r{self.parsed}/{total} files, {rate:.0f} files/s, {self.covers} covers, '
+                    f'{self.failed} failed', end)
+
+    def report(self, text, end):
+        if self.out is not None:
+            print(text, end=end, file=self.out, flush=True)
+
+
+class BackgroundIndexer:
+    """Parses the tags of scanned files on a background thread, so that search finds them before they are played.
+
+    Only tags and artwork keys are stored, covers are decoded once a track is shown.
+    """
+
+    def __init__(self):
+        self.dao = TrackDao()
+        self.executor = ThreadPoolExecutor(1, thread_name_prefix='index')
+        self.generation = 0  # batches queued before the last cancel() are skipped
+
+    def add(self, file_paths):
+        self.executor.submit(self.index, list(file_paths), self.generation)
+
+    def cancel(self):
+        self.generation += 1
+
+    def index(self, file_paths, generation):
+        tracks = []
+        for file_path in file_paths:
+            if generation != self.generation:
+                break
+            try:
+                stat = os.stat(file_path)
+                row = self.dao.get(file_path)
+                if row is not None and row[1:3] == (stat.st_mtime_ns, stat.st_size):
+                    continue
+                tracks.append(tuple(read_track(file_path, stat.st_mtime_ns, stat.st_size)[0]))
+            except (TinyTagException, OSError, ValueError, struct.error):
+                continue
+        if tracks:
+            self.dao.save_many(tracks)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog='py -m App index', description='Reads tags and artwork of every audio '
+                                     'file under a folder into the database, without opening the player')
+    parser.add_argument('folder')
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count(),
+                        help='parser processes (default: %(default)s)')
+    parser.add_argument('--batch', type=int, default=BATCH_SIZE, help='tracks per transaction (default: %(default)s)')
+    parser.add_argument('--db', default=App.database.db_path, help='database file (default: %(default)s)')
+    args = parser.parse_args(argv)
+    if not os.path.isdir(args.folder):
+        parser.error(f'{args.folder} is not a folder')
+
+    App.database.db_path = args.db
+    try:
+        Indexer(args.folder, args.workers, args.batch).run()
+    except KeyboardInterrupt:
+        return 130
+    return 0
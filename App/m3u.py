@@ -0,0 +1,86 @@
+import codecs
+import os
+from urllib.parse import unquote, urlparse
+
+from App.database import PlaylistDao, PlaylistException
+
+HEADER = '#EXTM3U'
+
+
+def decode_lines(m3u_path):
+    """Yields the lines of a playlist file as text.
+
+    M3U8 is UTF-8 by definition and is decoded strictly. Most plain M3U files written today are
+    UTF-8 too, but older players write them in the Windows code page: once a line is not valid
+    UTF-8, it and the rest of the file are read as cp1252, or as Latin-1 where cp1252 leaves a
+    byte undefined. Every line comes out as proper text, which SQLite can store.
+    """
+    strict = m3u_path.lower().endswith('.m3u8')
+    encoding = 'utf-8'
+    with open(m3u_path, 'rb') as file:
+        for number, line in enumerate(file):
+            if number == 0 and line.startswith(codecs.BOM_UTF8):
+                line = line[len(codecs.BOM_UTF8):]
+            if encoding == 'utf-8':
+                try:
+                    yield line.decode('utf-8')
+                    continue
+                except UnicodeDecodeError:
+                    if strict:
+                        raise
+                    encoding = 'cp1252'
+            try:
+                yield line.decode('cp1252')
+            except UnicodeDecodeError:
+                yield line.decode('latin-1')
+
+
+def read_m3u(m3u_path):
+    """Yields the absolute file paths of an M3U/M3U8 playlist line by line.
+
+    Comment and #EXT lines are skipped, relative entries are resolved against the playlist's
+    folder and file:// URLs are turned into paths. Other URLs cannot be played and are skipped.
+    """
+    folder = os.path.dirname(os.path.abspath(m3u_path))
+    for line in decode_lines(m3u_path):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        if '://' in line:
+            url = urlparse(line)
+            if url.scheme != 'file':
+                continue
+            line = unquote(url.path)
+        yield os.path.normpath(os.path.join(folder, line))
+
+
+def write_m3u(m3u_path, file_paths):
+    """Writes file paths from any iterable into an extended M3U8 playlist, one line at a time"""
+    with open(m3u_path, 'w', encoding='utf-8', errors='surrogateescape') as file:
+        file.write(HEADER + '\n')
+        for file_path in file_paths:
+            file.write(file_path + '\n')
+
+
+def import_m3u(user_id, m3u_path, name=None):
+    """Stores an M3U file as a named playlist, returns (playlist id, name, entry count).
+
+    The name defaults to the file name, numbered if the user already has a playlist with it.
+    """
+    dao = PlaylistDao()
+    base = name or os.path.splitext(os.path.basename(m3u_path))[0]
+    name, number = base, 1
+    while True:
+        try:
+            playlist_id = dao.create(user_id, name)
+            break
+        except PlaylistException:
+            number += 1
+            name = f'{base} ({number})'
+    try:
+        count = dao.append(playlist_id, read_m3u(m3u_path))
+    except (OSError, ValueError):
+        dao.con.rollback()
+        dao.delete(playlist_id)
+        raise
+    return playlist_id, name, count
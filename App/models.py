@@ -0,0 +1,123 @@
+from collections import OrderedDict
+
+from PyQt5 import QtCore
+from PyQt5.QtCore import Qt, QModelIndex
+
+from App.database import AudiofileDao
+from App.worker import get_worker
+
+COLUMNS = ('title', 'author')
+PAGE_SIZE = 200  # rows read from the database at once
+CACHED_PAGES = 8  # pages kept in memory, the view only ever shows a fraction of one
+
+
+class FavoritesModel(QtCore.QAbstractTableModel):
+    """Favorites of a user, paged in from SQLite while the view scrolls.
+
+    The view grows the row count through canFetchMore/fetchMore, while the rows themselves
+    are read on the database worker page by page and only the recently shown pages stay cached.
+    """
+
+    def __init__(self, user_id, parent=None):
+        super(FavoritesModel, self).__init__(parent)
+        self.dao = AudiofileDao()
+        self.user_id = user_id
+        self.order_by = None  # column name, or None for the order the songs were added in
+        self.descending = False
+        self.total = 0  # favorites in the database
+        self.loaded = 0  # rows exposed to the view so far
+        self.pages = OrderedDict()  # page number -> rows
+        self.starts = {0: None}  # page number -> (sort value, id) of the row before it, kept for every page read
+        self.pending = set()  # page numbers being read
+        self.generation = 0  # bumped on reset, so answers for an old ordering are dropped
+
+    def reload(self):
+        self.beginResetModel()
+        self.generation += 1
+        self.total = self.loaded = 0
+        self.pages.clear()
+        self.starts = {0: None}
+        self.pending.clear()
+        self.endResetModel()
+
+        generation = self.generation
+        get_worker().submit(self.dao.count, self.user_id, callback=lambda total: self.set_total(generation, total))
+
+    def set_total(self, generation, total):
+        if generation == self.generation:
+            self.total = total
+            self.fetchMore(QModelIndex())
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.loaded
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def canFetchMore(self, parent):
+        return not parent.isValid() and self.loaded < self.total
+
+    def fetchMore(self, parent):
+        count = min(PAGE_SIZE, self.total - self.loaded)
+        if parent.isValid() or count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self.loaded, self.loaded + count - 1)
+        self.loaded += count
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        page = self.page(index.row() // PAGE_SIZE)
+        row = index.row() % PAGE_SIZE
+        if page is None or row >= len(page):
+            return None  # filled in by dataChanged once the page has been read
+        return str(page[row][index.column() + 1])
+
+    def file_path(self, row):
+        """Path of the song in the row, None while its page is being read"""
+        page = self.pages.get(row // PAGE_SIZE)
+        if page is None or row % PAGE_SIZE >= len(page):
+            return None
+        return page[row % PAGE_SIZE][3]
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return COLUMNS[section]
+        return super(FavoritesModel, self).headerData(section, orientation, role)
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        """Sorting is done by SQLite, so it costs one page read whatever the size of the list"""
+        self.order_by = COLUMNS[column] if 0 <= column < len(COLUMNS) else None
+        self.descending = order == Qt.DescendingOrder
+        self.reload()
+
+    def page(self, number):
+        if number in self.pages:
+            self.pages.move_to_end(number)
+            return self.pages[number]
+        if number not in self.pending:
+            self.pending.add(number)
+            generation = self.generation
+            # seeks to the closest page whose start is known, usually the page itself
+            known = max(start for start in self.starts if start <= number)
+            get_worker().submit(self.dao.get_page, self.user_id, self.order_by, self.descending, PAGE_SIZE,
+                                self.starts[known], (number - known) * PAGE_SIZE,
+                                callback=lambda rows: self.page_loaded(generation, number, rows))
+        return self.pages.get(number)
+
+    def page_loaded(self, generation, number, rows):
+        if generation != self.generation:
+            return
+        self.pending.discard(number)
+        self.pages[number] = rows
+        if len(rows) == PAGE_SIZE:
+            last = rows[-1]
+            self.starts[number + 1] = (last[COLUMNS.index(self.order_by) + 1] if self.order_by else last[0], last[0])
+        while len(self.pages) > CACHED_PAGES:
+            self.pages.popitem(last=False)
+
+        first = number * PAGE_SIZE
+        last = min(first + len(rows), self.loaded) - 1
+        if last >= first:
+            self.dataChanged.emit(self.index(first, 0), self.index(last, len(COLUMNS) - 1))
@@ -0,0 +1,184 @@
+from PyQt5 import QtCore
+from PyQt5.QtMultimedia import QMediaPlayer, QMediaContent
+
+NOTIFY_INTERVAL = 250  # ms between positionChanged signals while playing
+PRELOAD_MARGIN = 5000  # ms before the end of a track when the next one is loaded
+CROSSFADE = 0  # ms the outgoing and the incoming track overlap, 0 for a plain gapless cut
+FADE_STEP = 50  # ms between volume steps of a crossfade
+
+
+class GaplessPlayer(QtCore.QObject):
+    """Two QMediaPlayers behind the QMediaPlayer interface the window uses.
+
+    One player is active, the other one is armed with the upcoming track shortly before the end
+    and starts the moment the active one reaches EndOfMedia, so the backend never has to open
+    and buffer a file between tracks. Signals are only forwarded from the active player.
+    The QMediaPlayers, which load the multimedia backend, are created on first use.
+    """
+
+    mediaStatusChanged = QtCore.pyqtSignal(int)
+    stateChanged = QtCore.pyqtSignal(int)
+    positionChanged = QtCore.pyqtSignal('qint64')
+    durationChanged = QtCore.pyqtSignal('qint64')
+    preloadRequested = QtCore.pyqtSignal()  # the active track is about to end, arm() the next one
+    advanced = QtCore.pyqtSignal()  # the armed track has taken over
+
+    def __init__(self, parent=None, gapless=True, crossfade=CROSSFADE, notify_interval=NOTIFY_INTERVAL):
+        super(GaplessPlayer, self).__init__(parent)
+        self.gapless = gapless
+        self.crossfade = crossfade
+        self.created = []
+        self.active_index = 0
+        self.outgoing = None  # player fading out during a crossfade
+        self.armed = False
+        self.preload_requested = False
+        self.level = 100
+        self.notify_interval = notify_interval
+
+        self.fade_clock = QtCore.QElapsedTimer()
+        self.fade_timer = QtCore.QTimer(self)
+        self.fade_timer.setInterval(FADE_STEP)
+        self.fade_timer.timeout.connect(self.fade)
+
+    @property
+    def players(self):
+        if not self.created:
+            self.created = [self.create_player(), self.create_player()]
+        return self.created
+
+    @property
+    def active(self):
+        return self.players[self.active_index]
+
+    @property
+    def idle(self):
+        return self.players[1 - self.active_index]
+
+    def create_player(self):
+        player = QMediaPlayer(self)
+        player.setVolume(self.level)
+        player.setNotifyInterval(self.notify_interval)
+        player.mediaStatusChanged.connect(lambda status: self.on_status(player, status))
+        player.positionChanged.connect(lambda position: self.on_position(player, position))
+        player.stateChanged.connect(lambda state: self.forward(player, self.stateChanged, state))
+        player.durationChanged.connect(lambda duration: self.forward(player, self.durationChanged, duration))
+        return player
+
+    def setMedia(self, content):
+        self.disarm()
+        self.active.setMedia(content)
+
+    def play(self):
+        self.active.play()
+
+    def pause(self):
+        self.finish_fade()
+        self.active.pause()
+
+    def stop(self):
+        self.disarm()
+        if self.created:
+            self.active.stop()
+
+    def state(self):
+        return self.active.state() if self.created else QMediaPlayer.StoppedState
+
+    def mediaStatus(self):
+        return self.active.mediaStatus() if self.created else QMediaPlayer.NoMedia
+
+    def position(self):
+        return self.active.position() if self.created else 0
+
+    def setPosition(self, position):
+        self.active.setPosition(position)
+
+    def duration(self):
+        return self.active.duration() if self.created else 0
+
+    def volume(self):
+        return self.level
+
+    def setVolume(self, volume):
+        self.level = volume
+        if self.created and not self.fade_timer.isActive():
+            self.active.setVolume(volume)
+
+    def setNotifyInterval(self, interval):
+        self.notify_interval = interval
+        for player in self.created:
+            player.setNotifyInterval(interval)
+
+    def arm(self, url):
+        """Loads the upcoming track into the idle player"""
+        if not self.gapless:
+            return
+        self.finish_fade()
+        self.idle.setMedia(QMediaContent(url))
+        self.armed = True
+
+    def disarm(self):
+        self.finish_fade()
+        if self.armed:
+            self.idle.setMedia(QMediaContent())
+        self.armed = False
+        self.preload_requested = False
+
+    def forward(self, player, signal, value):
+        if player is self.active:
+            signal.emit(value)
+
+    def on_position(self, player, position):
+        if player is not self.active:
+            return
+        self.positionChanged.emit(position)
+
+        remaining = player.duration() - position
+        if self.gapless and not self.preload_requested and 0 < remaining <= PRELOAD_MARGIN + self.crossfade:
+            self.preload_requested = True
+            self.preloadRequested.emit()
+        elif self.crossfade and self.armed and remaining <= self.crossfade:
+            self.take_over()
+
+    def on_status(self, player, status):
+        if player is not self.active:
+            return
+        if status == QMediaPlayer.EndOfMedia and self.armed:
+            self.take_over()
+        else:
+            self.mediaStatusChanged.emit(status)
+
+    def take_over(self):
+        """Starts the armed player and makes it the active one"""
+        outgoing = self.active
+        self.active_index = 1 - self.active_index
+        self.armed = False
+        self.preload_requested = False
+
+        if self.crossfade and outgoing.state() == QMediaPlayer.PlayingState:
+            self.outgoing = outgoing
+            self.active.setVolume(0)
+            self.fade_clock.start()
+            self.fade_timer.start()
+        else:
+            self.active.setVolume(self.level)
+        self.active.play()
+
+        self.durationChanged.emit(self.active.duration())
+        self.stateChanged.emit(self.active.state())
+        self.advanced.emit()
+
+    def fade(self):
+        progress = min(self.fade_clock.elapsed() / self.crossfade, 1.0)
+        self.active.setVolume(round(self.level * progress))
+        self.outgoing.setVolume(round(self.level * (1 - progress)))
+        if progress >= 1.0:
+            self.finish_fade()
+
+    def finish_fade(self):
+        if self.outgoing is None:
+            return
+        self.fade_timer.stop()
+        self.outgoing.stop()
+        self.outgoing.setMedia(QMediaContent())
+        self.outgoing = None
+        self.active.setVolume(self.level)
@@ -0,0 +1,310 @@
+import os
+import random
+from array import array
+from bisect import bisect_left
+from collections import deque
+from itertools import islice
+
+# what happens when a track reaches its end
+ADVANCE = 'advance'  # go to the next entry, starting over after the last one
+ONCE = 'once'  # go to the next entry, stop after the last one
+REPEAT = 'repeat'  # play the same track again
+STOP = 'stop'
+END_POLICIES = {ADVANCE: 'Repeat Playlist', ONCE: 'Play Playlist Once', REPEAT: 'Repeat Track', STOP: 'Stop After Track'}
+
+HISTORY_SIZE = 1000  # played entries remembered for going back
+SHUFFLE_LOOKAHEAD = 4  # upcoming entries worth prefetching while shuffling
+SEPARATOR = b'\0'  # ends every file name in the name buffer, cannot occur in a path
+
+
+class Playlist:
+    """List of file paths that stores every directory only once.
+
+    A path is split into its directory, kept in a table, and its file name, kept encoded in one
+    shared buffer. Arrays hold where each name starts and which directory it belongs to, so an
+    entry takes a few dozen bytes instead of a whole str object, while indexing works like on a list.
+    """
+
+    def __init__(self, file_paths=()):
+        self.clear()
+        self.extend(file_paths)
+
+    def clear(self):
+        self.folders = []  # directory prefixes, including the trailing separator
+        self.folder_ids = {}
+        self.names = bytearray(SEPARATOR)
+        self.starts = array('Q')  # offset of every file name in names
+        self.folder_of = array('I')  # index into folders for every entry
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        start = self.starts[index]
+        if index < 0:
+            index += len(self.starts)
+        end = self.starts[index + 1] - 1 if index + 1 < len(self.starts) else len(self.names) - 1
+        return self.folders[self.folder_of[index]] + self.names[start:end].decode('utf-8', 'surrogateescape')
+
+    def __iter__(self):
+        for index in range(len(self.starts)):
+            yield self[index]
+
+    def __contains__(self, file_path):
+        try:
+            self.index(file_path)
+        except ValueError:
+            return False
+        return True
+
+    def append(self, file_path):
+        folder, name = split(file_path)
+        folder_id = self.folder_ids.get(folder)
+        if folder_id is None:
+            folder_id = self.folder_ids[folder] = len(self.folders)
+            self.folders.append(folder)
+        self.starts.append(len(self.names))
+        self.names += name.encode('utf-8', 'surrogateescape') + SEPARATOR
+        self.folder_of.append(folder_id)
+
+    def extend(self, file_paths):
+        for file_path in file_paths:
+            self.append(file_path)
+
+    def index(self, file_path):
+        """Finds the first entry of file_path by searching the name buffer, without decoding entries"""
+        folder, name = split(file_path)
+        folder_id = self.folder_ids.get(folder)
+        if folder_id is not None:
+            needle = SEPARATOR + name.encode('utf-8', 'surrogateescape') + SEPARATOR
+            found = self.names.find(needle)
+            while found != -1:
+                index = bisect_left(self.starts, found + 1)
+                if self.folder_of[index] == folder_id:
+                    return index
+                found = self.names.find(needle, found + 1)
+        raise ValueError(f'{file_path!r} is not in playlist')
+
+
+def split(file_path):
+    """Splits a path into its directory, with the trailing separator, and the file name"""
+    cut = max(file_path.rfind('/'), file_path.rfind(os.sep)) + 1
+    return file_path[:cut], file_path[cut:]
+
+
+class LazyShuffle:
+    """Fisher-Yates shuffle of range(size) that draws one index at a time.
+
+    Only positions touched by a swap are stored, so starting a shuffle costs nothing and every
+    draw is O(1) however long the playlist is. The size may grow between draws.
+    """
+
+    def __init__(self, size=0, rng=None, played=None, avoid=None):
+        self.size = size
+        self.drawn = 0  # positions before this one hold the indices drawn so far
+        self.swapped = {}  # position -> index, for positions that no longer hold their own index
+        self.positions = {}  # index -> position, the inverse of swapped
+        self.random = rng if rng is not None else random.Random()
+        self.avoid = avoid  # index that must not come first, e.g. the last one of the previous round
+        if played is not None and 0 <= played < size:
+            # counts the index that is playing already as drawn, so the shuffle does not start with it
+            self.mark(played)
+
+    def place(self, position, index):
+        if position == index:
+            self.swapped.pop(position, None)
+            self.positions.pop(index, None)
+        else:
+            self.swapped[position] = index
+            self.positions[index] = position
+
+    def swap(self, first, second):
+        first_index, second_index = self.swapped.get(first, first), self.swapped.get(second, second)
+        self.place(first, second_index)
+        self.place(second, first_index)
+
+    def mark(self, index):
+        """Counts index as drawn, e.g. because the user picked it, so it does not come up again this round"""
+        position = self.positions.get(index, index)
+        if self.drawn <= position < self.size:
+            self.swap(self.drawn, position)
+            self.drawn += 1
+
+    def draw(self):
+        """Returns the next index of the permutation, or None once every index has been drawn"""
+        if self.drawn >= self.size:
+            return None
+        first = self.drawn
+        avoid, self.avoid = self.avoid, None
+        if avoid is not None and self.size - first > 1 and self.positions.get(avoid, avoid) >= first:
+            # parks the avoided index at the drawing position, so the draw below can only swap it away
+            self.swap(first, self.positions.get(avoid, avoid))
+            first += 1
+        self.swap(self.drawn, self.random.randrange(first, self.size))
+        index = self.swapped.get(self.drawn, self.drawn)
+        self.drawn += 1
+        return index
+
+
+class PlayOrder:
+    """Decides which playlist index plays next.
+
+    The play-next queue goes first, then the linear or shuffled order. Entries are remembered
+    in a history, so going back and then forward again replays the same tracks, like in a web
+    browser. Only indices are handled here, the playlist itself is never copied.
+    """
+
+    def __init__(self, size=0, rng=None):
+        self.random = rng if rng is not None else random.Random()
+        self.shuffle = False
+        self.wrap = True  # start over after the last entry
+        self.reset(size)
+
+    def reset(self, size, current=None):
+        """Starts over for a new or changed playlist, current is the index playing now"""
+        self.size = size
+        self.queue = deque()
+        self.history = deque(maxlen=HISTORY_SIZE)
+        self.back = 0  # steps the user went back in the history
+        self.lookahead = deque()  # drawn from the order but not played yet
+        self.permutation = LazyShuffle(size, self.random, current)
+        self.finished = None  # the permutation the lookahead started out from, until its last entry plays
+        self.round_left = 0  # lookahead entries left from the finished permutation
+        self.position = -1  # place in the linear order
+        if current is not None:
+            self.jump(current)
+
+    def grow(self, size):
+        """Entries were appended to the playlist, upcoming entries picked while it was shorter are picked again"""
+        self.size = size
+        if not self.shuffle:
+            self.clear_lookahead()  # may hold a wrap to the start, the linear order continues from position
+        elif self.finished is not None:
+            # the round that wrapped too early goes on with the new entries
+            for _ in range(len(self.lookahead) - self.round_left):
+                self.lookahead.pop()
+            self.permutation, self.finished = self.finished, None
+        self.permutation.size = size
+
+    def set_shuffle(self, enabled):
+        self.shuffle = enabled
+        self.clear_lookahead()
+        self.permutation = LazyShuffle(self.size, self.random, self.current)
+
+    @property
+    def current(self):
+        return self.history[-1 - self.back] if self.history else None
+
+    def jump(self, index):
+        """The user picked an entry, the linear order continues after it"""
+        self.forget_forward()
+        self.history.append(index)
+        self.position = index
+        if not self.shuffle:
+            self.clear_lookahead()
+        elif index in self.lookahead:
+            if self.lookahead.index(index) < self.round_left:
+                self.round_left -= 1
+            self.lookahead.remove(index)
+        else:
+            self.permutation.mark(index)
+
+    def play_next(self, index):
+        self.queue.append(index)
+
+    def next(self):
+        """Moves on and returns the index to play, or None at the end when not wrapping"""
+        if self.queue:
+            self.forget_forward()
+            index = self.queue.popleft()
+        elif self.back:
+            self.back -= 1
+            return self.current
+        else:
+            index = self.draw()
+            if index is None:
+                return None
+            if not self.shuffle:
+                self.position = index
+        self.history.append(index)
+        return index
+
+    def previous(self):
+        """Goes back in the history, or to the entry before the current one when there is none"""
+        if len(self.history) - self.back > 1:
+            self.back += 1
+            return self.current
+        if not self.size:
+            return None
+        index = ((self.current if self.current is not None else 0) - 1) % self.size
+        self.forget_forward()
+        if self.history:
+            self.history.pop()
+        self.history.append(index)
+        self.position = index
+        self.clear_lookahead()
+        return index
+
+    def peek(self, count=1):
+        """Indices that the next calls of next() will return, without moving on"""
+        upcoming = list(islice(self.queue, count))
+        if not self.queue:  # queued entries replace the ones the user went back from
+            upcoming += [self.history[-i] for i in range(self.back, 0, -1)][:count]
+        if len(upcoming) < count:
+            self.fill_lookahead(count - len(upcoming))
+            upcoming += islice(self.lookahead, count - len(upcoming))
+        return upcoming
+
+    def neighbours(self):
+        """Indices worth prefetching: the upcoming ones and the one previous() would go to"""
+        indices = self.peek(SHUFFLE_LOOKAHEAD if self.shuffle else 1)
+        if len(self.history) - self.back > 1:
+            indices.append(self.history[-2 - self.back])
+        elif self.size and self.current is not None:
+            indices.append((self.current - 1) % self.size)
+        return [index for index in dict.fromkeys(indices) if index != self.current]
+
+    def draw(self):
+        if not self.lookahead:
+            self.fill_lookahead(1)
+        if not self.lookahead:
+            return None
+        if self.round_left:
+            self.round_left -= 1
+        else:
+            self.finished = None  # the new round has started playing
+        return self.lookahead.popleft()
+
+    def clear_lookahead(self):
+        self.lookahead.clear()
+        self.finished = None
+        self.round_left = 0
+
+    def fill_lookahead(self, count):
+        """Draws from the order until count entries are waiting, returns False at the end"""
+        while len(self.lookahead) < count:
+            if self.shuffle:
+                index = self.permutation.draw()
+                if index is None and self.wrap and self.size:
+                    last = self.lookahead[-1] if self.lookahead else self.current
+                    if self.finished is None:
+                        self.finished, self.round_left = self.permutation, len(self.lookahead)
+                    self.permutation = LazyShuffle(self.size, self.random, avoid=last)
+                    index = self.permutation.draw()
+            else:
+                last = self.lookahead[-1] if self.lookahead else self.position
+                index = last + 1
+                if index >= self.size:
+                    index = 0 if self.wrap and self.size else None
+            if index is None:
+                return False
+            self.lookahead.append(index)
+        return True
+
+    def forget_forward(self):
+        """Drops the entries the user went back from, they will not be replayed"""
+        for _ in range(self.back):
+            self.history.pop()
+        self.back = 0
@@ -0,0 +1,52 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5 import QtCore
+
+WORKERS = 2
+
+
+class Prefetcher(QtCore.QObject):
+    """Loads tags and covers of playlist entries on a thread pool, the neighbours ahead of time"""
+
+    loaded = QtCore.pyqtSignal(str, object)  # file path, future of (track, (cover, color))
+
+    def __init__(self, track_cache, workers=WORKERS, parent=None):
+        super(Prefetcher, self).__init__(parent)
+        self.track_cache = track_cache
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix='prefetch')
+        self.futures = {}  # file path -> future of (track, (cover, color))
+
+    def load(self, file_path):
+        track = self.track_cache.get(file_path)
+        return track, self.track_cache.artwork(track)
+
+    def schedule(self, file_paths):
+        """Starts loading file_paths and cancels work for entries that are no longer wanted"""
+        wanted = set(file_paths)
+        for file_path in list(self.futures):
+            if file_path not in wanted:
+                self.futures.pop(file_path).cancel()
+        for file_path in file_paths:
+            if file_path not in self.futures:
+                self.futures[file_path] = self.executor.submit(self.load, file_path)
+
+    def get(self, file_path):
+        """Returns prefetched (track, (cover, color)), or None and emits loaded once it has been read"""
+        future = self.futures.pop(file_path, None)
+        if future is not None and future.done() and not future.cancelled() and future.exception() is None:
+            return future.result()
+        if future is None or future.done() or future.cancel():
+            # the entry is wanted right now, so it goes before neighbours that haven't started yet
+            for neighbour, pending in list(self.futures.items()):
+                if pending.cancel():
+                    del self.futures[neighbour]
+            future = self.executor.submit(self.load, file_path)
+        # a running load is joined, never started twice; delivered through the GUI thread's event loop
+        future.add_done_callback(lambda result: self.loaded.emit(file_path, result))
+        return None
+
+    def clear(self):
+        """Drops all scheduled work, e.g. when the playlist is replaced"""
+        for future in self.futures.values():
+            future.cancel()
+        self.futures.clear()
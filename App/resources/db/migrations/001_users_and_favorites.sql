@@ -1,7 +1,5 @@
-DROP TABLE IF EXISTS audiofile;
-DROP TABLE IF EXISTS user;
-
-CREATE TABLE audiofile
+-- the schema of the first release, databases created by it start from here
+CREATE TABLE IF NOT EXISTS audiofile
 (
     id        INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
     user_id   INTEGER REFERENCES user           NOT NULL,
@@ -11,10 +9,10 @@ CREATE TABLE audiofile
     UNIQUE (user_id, file_path)
 );
 
-CREATE TABLE user
+CREATE TABLE IF NOT EXISTS user
 (
     id       INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
     name     TEXT                              NOT NULL,
     login    TEXT UNIQUE                       NOT NULL,
     password TEXT                              NOT NULL
-);
\ No newline at end of file
+);
@@ -0,0 +1,12 @@
+CREATE TABLE IF NOT EXISTS artwork
+(
+    hash      TEXT PRIMARY KEY                  NOT NULL,
+    image     BLOB                              NOT NULL,
+    red       INTEGER                           NOT NULL,
+    green     INTEGER                           NOT NULL,
+    blue      INTEGER                           NOT NULL,
+    size      INTEGER                           NOT NULL,
+    last_used REAL                              NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS artwork_last_used ON artwork (last_used);
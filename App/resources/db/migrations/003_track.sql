@@ -0,0 +1,13 @@
+CREATE TABLE IF NOT EXISTS track
+(
+    file_path TEXT PRIMARY KEY                  NOT NULL,
+    mtime     INTEGER                           NOT NULL,
+    size      INTEGER                           NOT NULL,
+    title     TEXT,
+    artist    TEXT,
+    album     TEXT,
+    genre     TEXT,
+    year      TEXT,
+    duration  REAL,
+    artwork   TEXT REFERENCES artwork
+);
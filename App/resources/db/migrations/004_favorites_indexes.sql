@@ -0,0 +1,2 @@
+CREATE INDEX IF NOT EXISTS audiofile_user_title ON audiofile (user_id, title COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS audiofile_user_author ON audiofile (user_id, author COLLATE NOCASE);
@@ -0,0 +1,53 @@
+-- full-text index over the tags in track, the file name is the part of file_path after the last '/'
+CREATE VIEW IF NOT EXISTS track_text AS
+SELECT rowid                                                          AS id,
+       title,
+       artist,
+       album,
+       replace(file_path, rtrim(file_path, replace(file_path, '/', '')), '') AS file_name
+FROM track;
+
+CREATE VIRTUAL TABLE IF NOT EXISTS track_search USING fts5
+(
+    title,
+    artist,
+    album,
+    file_name,
+    content = 'track_text',
+    content_rowid = 'id',
+    prefix = '1 2 3',
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS track_search_insert
+    AFTER INSERT
+    ON track
+BEGIN
+    INSERT INTO track_search(rowid, title, artist, album, file_name)
+    VALUES (new.rowid, new.title, new.artist, new.album,
+            replace(new.file_path, rtrim(new.file_path, replace(new.file_path, '/', '')), ''));
+END;
+
+CREATE TRIGGER IF NOT EXISTS track_search_delete
+    AFTER DELETE
+    ON track
+BEGIN
+    INSERT INTO track_search(track_search, rowid, title, artist, album, file_name)
+    VALUES ('delete', old.rowid, old.title, old.artist, old.album,
+            replace(old.file_path, rtrim(old.file_path, replace(old.file_path, '/', '')), ''));
+END;
+
+CREATE TRIGGER IF NOT EXISTS track_search_update
+    AFTER UPDATE
+    ON track
+BEGIN
+    INSERT INTO track_search(track_search, rowid, title, artist, album, file_name)
+    VALUES ('delete', old.rowid, old.title, old.artist, old.album,
+            replace(old.file_path, rtrim(old.file_path, replace(old.file_path, '/', '')), ''));
+    INSERT INTO track_search(rowid, title, artist, album, file_name)
+    VALUES (new.rowid, new.title, new.artist, new.album,
+            replace(new.file_path, rtrim(new.file_path, replace(new.file_path, '/', '')), ''));
+END;
+
+-- indexes the tracks cached before the search existed
+INSERT INTO track_search(track_search) VALUES ('rebuild');
@@ -0,0 +1,16 @@
+CREATE TABLE IF NOT EXISTS playlist
+(
+    id      INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+    user_id INTEGER REFERENCES user           NOT NULL,
+    name    TEXT                              NOT NULL,
+    UNIQUE (user_id, name)
+);
+
+-- entries are numbered from 0 in playlist order, the key keeps them clustered by playlist
+CREATE TABLE IF NOT EXISTS playlist_entry
+(
+    playlist_id INTEGER REFERENCES playlist NOT NULL,
+    position    INTEGER                     NOT NULL,
+    file_path   TEXT                        NOT NULL,
+    PRIMARY KEY (playlist_id, position)
+) WITHOUT ROWID;
@@ -0,0 +1,48 @@
+-- the file name is now taken after the last '/' or '\', so Windows paths index their file name too
+DROP TRIGGER IF EXISTS track_search_insert;
+DROP TRIGGER IF EXISTS track_search_delete;
+DROP TRIGGER IF EXISTS track_search_update;
+DROP VIEW IF EXISTS track_text;
+
+CREATE VIEW track_text AS
+SELECT rowid                                                                       AS id,
+       title,
+       artist,
+       album,
+       replace(replace(file_path, '\', '/'),
+               rtrim(replace(file_path, '\', '/'), replace(replace(file_path, '\', '/'), '/', '')), '') AS file_name
+FROM track;
+
+CREATE TRIGGER track_search_insert
+    AFTER INSERT
+    ON track
+BEGIN
+    INSERT INTO track_search(rowid, title, artist, album, file_name)
+    SELECT id, title, artist, album, file_name FROM track_text WHERE id = new.rowid;
+END;
+
+CREATE TRIGGER track_search_delete
+    BEFORE DELETE
+    ON track
+BEGIN
+    INSERT INTO track_search(track_search, rowid, title, artist, album, file_name)
+    SELECT 'delete', id, title, artist, album, file_name FROM track_text WHERE id = old.rowid;
+END;
+
+CREATE TRIGGER track_search_update
+    BEFORE UPDATE
+    ON track
+BEGIN
+    INSERT INTO track_search(track_search, rowid, title, artist, album, file_name)
+    SELECT 'delete', id, title, artist, album, file_name FROM track_text WHERE id = old.rowid;
+END;
+
+CREATE TRIGGER track_search_updated
+    AFTER UPDATE
+    ON track
+BEGIN
+    INSERT INTO track_search(rowid, title, artist, album, file_name)
+    SELECT id, title, artist, album, file_name FROM track_text WHERE id = new.rowid;
+END;
+
+INSERT INTO track_search(track_search) VALUES ('rebuild');
@@ -63,14 +63,12 @@ class Ui_FavoriteWidget(object):
         self.delete_button.setObjectName("delete_button")
         self.horizontalLayout.addWidget(self.delete_button)
         self.verticalLayout.addLayout(self.horizontalLayout)
-        self.table = QtWidgets.QTableWidget(FavoriteWidget)
+        self.table = QtWidgets.QTableView(FavoriteWidget)
         self.table.setStyleSheet("background-color: rgb(255, 255, 255);\n"
 "border-color: rgb(98, 64, 194);")
         self.table.setVerticalScrollBarPolicy(QtCore.Qt.ScrollBarAlwaysOff)
         self.table.setHorizontalScrollBarPolicy(QtCore.Qt.ScrollBarAlwaysOff)
-        self.table.setColumnCount(2)
         self.table.setObjectName("table")
-        self.table.setRowCount(0)
         self.table.horizontalHeader().setDefaultSectionSize(300)
         self.verticalLayout.addWidget(self.table)
 
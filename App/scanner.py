@@ -0,0 +1,91 @@
+import os
+import time
+
+from PyQt5 import QtCore
+
+from App.tracing import timed
+
+AUDIO_EXTENSIONS = ('.mp3', '.wav')
+BATCH_SIZE = 500
+FLUSH_INTERVAL = 0.1  # seconds, a batch is sent at least this often while files are found
+
+
+def scan_folder(folder_path, extensions=AUDIO_EXTENSIONS, interrupted=None):
+    """Returns the subfolders and audio file entries directly in a folder, raises OSError if it cannot be read.
+
+    Listing stops early, with what has been found so far, as soon as interrupted() returns true.
+    """
+    folder_paths, files = [], []
+    with os.scandir(folder_path) as iterator:
+        for entry in iterator:
+            if interrupted is not None and interrupted():
+                break
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    folder_paths.append(entry.path)
+                elif entry.name.lower().endswith(extensions) and entry.is_file():
+                    files.append(entry)
+            except OSError:
+                continue
+    return folder_paths, files
+
+
+def walk(folder_path, extensions=AUDIO_EXTENSIONS, interrupted=None):
+    """Yields (folder path, audio file entries) for every readable folder of a tree, depth first.
+
+    Ends without yielding the folder being listed once interrupted() returns true.
+    """
+    stack = [folder_path]
+    while stack:
+        folder_path = stack.pop()
+        try:
+            folder_paths, files = scan_folder(folder_path, extensions, interrupted)
+        except OSError:
+            continue
+        if interrupted is not None and interrupted():
+            return
+        stack.extend(folder_paths)
+        yield folder_path, files
+
+
+class FolderScanner(QtCore.QThread):
+    """Walks a folder recursively in a background thread and streams audio file paths in batches"""
+
+    found = QtCore.pyqtSignal(list)  # batch of paths in playlist order
+    progress = QtCore.pyqtSignal(int, int)  # files found, folders scanned so far
+
+    def __init__(self, folder_path, parent=None, extensions=AUDIO_EXTENSIONS, batch_size=BATCH_SIZE):
+        super(FolderScanner, self).__init__(parent)
+        self.folder_path = folder_path
+        self.extensions = extensions
+        self.batch_size = batch_size
+        self.folder_paths = []  # every folder walked, complete once the thread has finished
+
+    @timed('open_folder.scan')
+    def run(self):
+        self.batch = []
+        self.files, self.folders = 0, 0
+        self.last_flush = 0.0  # far in the past, so the first file is sent right away
+
+        for folder_path, files in walk(self.folder_path, self.extensions, self.isInterruptionRequested):
+            self.folder_paths.append(folder_path)
+            self.folders += 1
+            for entry in files:
+                self.batch.append(entry.path)
+                if len(self.batch) >= self.batch_size or time.monotonic() - self.last_flush >= FLUSH_INTERVAL:
+                    self.flush()
+
+        if not self.isInterruptionRequested():
+            self.flush()
+
+    def flush(self):
+        if self.batch:
+            self.files += len(self.batch)
+            self.found.emit(self.batch)
+            self.batch = []
+        self.progress.emit(self.files, self.folders)
+        self.last_flush = time.monotonic()
+
+    def cancel(self):
+        """Stops the walk within one directory entry, the thread finishes right after"""
+        self.requestInterruption()
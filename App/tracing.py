@@ -0,0 +1,150 @@
+import atexit
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+
+# set AUDIOPLAYER_TRACE to a file path to collect span timings, *.json gets JSON, anything else Prometheus text
+output_path = os.environ.get('AUDIOPLAYER_TRACE')
+enabled = bool(output_path)
+EXPORT_INTERVAL = 10.0  # seconds between two writes of the metrics file
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, float('inf'))  # seconds
+
+histograms = {}  # span name -> [bucket counts, sum, count]
+lock = threading.Lock()
+exporter = None
+
+
+class Span:
+    """Times a with-block and adds the duration to the histogram of its name"""
+
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class NullSpan:
+    """Stands in for Span while tracing is disabled, entering and leaving it does nothing"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+def span(name):
+    return Span(name) if enabled else NULL_SPAN
+
+
+def record(name, duration):
+    with lock:
+        histogram = histograms.get(name)
+        if histogram is None:
+            histogram = histograms[name] = [[0] * len(BUCKETS), 0.0, 0]
+        for i, bound in enumerate(BUCKETS):
+            if duration <= bound:
+                histogram[0][i] += 1
+                break
+        histogram[1] += duration
+        histogram[2] += 1
+
+
+def traced(cls):
+    """Class decorator wrapping every public method into a span named Class.method.
+
+    The methods are only wrapped when tracing is enabled at import time, so a disabled build
+    calls them directly without any extra frame.
+    """
+    if not enabled:
+        return cls
+    for name, func in list(vars(cls).items()):
+        if name.startswith('_') or not inspect.isfunction(func) or inspect.isgeneratorfunction(func):
+            continue
+        setattr(cls, name, wrap(func, f'{cls.__name__}.{name}'))
+    return cls
+
+
+def timed(name):
+    """Function decorator putting every call into a span, the function stays untouched while tracing is disabled"""
+    def decorator(func):
+        return wrap(func, name) if enabled else func
+    return decorator
+
+
+def wrap(func, name):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with Span(name):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def snapshot():
+    """Returns a copy of the histograms, safe to format while spans keep being recorded"""
+    with lock:
+        return {name: (list(buckets), total, count) for name, (buckets, total, count) in histograms.items()}
+
+
+def to_prometheus(histograms):
+    lines = ['# HELP audioplayer_span_seconds Duration of traced spans',
+             '# TYPE audioplayer_span_seconds histogram']
+    for name, (buckets, total, count) in sorted(histograms.items()):
+        cumulative = 0
+        for bound, bucket in zip(BUCKETS, buckets):
+            cumulative += bucket
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            lines.append(f'audioplayer_span_seconds_bucket{{span="{name}",le="{le}"}} {cumulative}')
+        lines.append(f'audioplayer_span_seconds_sum{{span="{name}"}} {total!r}')
+        lines.append(f'audioplayer_span_seconds_count{{span="{name}"}} {count}')
+    return '\n'.join(lines) + '\n'
+
+
+def to_json(histograms):
+    """Unlike in the Prometheus text, every bucket counts only the spans that fell into it"""
+    return json.dumps({name: {'buckets': dict(zip(('+Inf' if bound == float('inf') else bound for bound in BUCKETS),
+                                                  buckets)), 'sum': total, 'count': count}
+                       for name, (buckets, total, count) in sorted(histograms.items())}, indent=2)
+
+
+def export(path=None):
+    """Writes the histograms to path, replacing the previous file in one step so readers never see half of it"""
+    path = path or output_path
+    histograms = snapshot()
+    text = to_json(histograms) if path.endswith('.json') else to_prometheus(histograms)
+    temporary = path + '.tmp'
+    with open(temporary, 'w') as file:
+        file.write(text)
+    os.replace(temporary, path)
+
+
+def start(interval=EXPORT_INTERVAL):
+    """Starts the periodic export if tracing is enabled, the last export happens at exit"""
+    global exporter
+    if not enabled or exporter is not None:
+        return
+    stopped = threading.Event()
+
+    def run():
+        while not stopped.wait(interval):
+            export()
+
+    exporter = threading.Thread(target=run, name='tracing', daemon=True)
+    exporter.start()
+    atexit.register(lambda: (stopped.set(), export()))
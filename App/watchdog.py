@@ -0,0 +1,132 @@
+import logging
+import math
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import defaultdict
+
+from PyQt5 import QtCore
+
+HEARTBEAT = 10  # ms between two heartbeats of the GUI thread
+DEFAULT_THRESHOLD = 50  # ms
+MIN_THRESHOLD = 3 * HEARTBEAT  # ms, shorter thresholds would report the jitter of the heartbeat timer
+
+
+def read_threshold(value):
+    """Stall threshold in seconds from a number of milliseconds, the default for an empty or non-numeric value"""
+    try:
+        threshold = float(value)
+    except (TypeError, ValueError):
+        return DEFAULT_THRESHOLD / 1000
+    if not math.isfinite(threshold):
+        return DEFAULT_THRESHOLD / 1000
+    return max(threshold, MIN_THRESHOLD) / 1000
+
+
+# set AUDIOPLAYER_WATCHDOG to report event loop stalls: to a threshold in milliseconds, at least MIN_THRESHOLD,
+# or to any other value such as true for the default
+enabled = 'AUDIOPLAYER_WATCHDOG' in os.environ
+THRESHOLD = read_threshold(os.environ.get('AUDIOPLAYER_WATCHDOG'))  # seconds
+WATCHED = ('MainWindow', 'FavoriteWidget')  # classes whose methods are reported as the stalled slot
+
+log = logging.getLogger(__name__)
+watchdog = None
+
+
+class StallWatchdog(QtCore.QObject):
+    """Reports when the Qt event loop stops turning for longer than a threshold.
+
+    A timer on the GUI thread leaves heartbeats, a helper thread notices when they stop and
+    captures the GUI thread's Python stack while it is still stuck. Once the loop turns again
+    the stall is logged with its duration and the MainWindow or FavoriteWidget slot that ran.
+    """
+
+    def __init__(self, threshold=THRESHOLD, parent=None):
+        super(StallWatchdog, self).__init__(parent)
+        self.threshold = threshold
+        self.gui_thread = threading.get_ident()
+        self.last_beat = time.monotonic()
+        self.beats = 0
+        self.captured = None  # (beat number, slot, location, stack) of the ongoing stall
+        self.stalls = []  # (duration, slot, location)
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.setInterval(HEARTBEAT)
+        self.timer.timeout.connect(self.beat)
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.watch, name='watchdog', daemon=True)
+
+    def start(self):
+        self.last_beat = time.monotonic()
+        self.timer.start()
+        self.thread.start()
+
+    def stop(self):
+        self.timer.stop()
+        self.stopped.set()
+
+    def beat(self):
+        now = time.monotonic()
+        stall = now - self.last_beat - HEARTBEAT / 1000
+        captured, self.captured = self.captured, None
+        self.last_beat = now
+        self.beats += 1
+        if stall < self.threshold:
+            return
+
+        if captured is not None and captured[0] == self.beats - 1:
+            slot, location, stack = captured[1:]
+        else:  # the stack could not be sampled in time, e.g. C code held the GIL all along
+            slot, location, stack = 'unknown', 'unknown', []
+        self.stalls.append((stall, slot, location))
+        log.warning('GUI thread stalled for %.0f ms in %s at %s\n%s', stall * 1000, slot, location, ''.join(stack))
+
+    def watch(self):
+        """Runs on the helper thread, samples the GUI stack once per stall"""
+        while not self.stopped.wait(self.threshold / 4):
+            beats = self.beats
+            if self.captured is None and time.monotonic() - self.last_beat > self.threshold + HEARTBEAT / 1000:
+                frame = sys._current_frames().get(self.gui_thread)
+                if frame is not None and beats == self.beats:
+                    self.captured = (beats, *describe(frame))
+
+    def report(self):
+        """Logs stall counts and durations per slot, worst first"""
+        if not self.stalls:
+            log.warning('No GUI stalls over %.0f ms', self.threshold * 1000)
+            return
+        slots = defaultdict(list)
+        for stall, slot, location in self.stalls:
+            slots[slot].append(stall)
+        lines = [f'{len(self.stalls)} GUI stalls over {self.threshold * 1000:.0f} ms:']
+        for slot, stalls in sorted(slots.items(), key=lambda item: -sum(item[1])):
+            lines.append(f'  {slot:<40} {len(stalls):>5}x  total {sum(stalls) * 1000:8.0f} ms  '
+                         f'max {max(stalls) * 1000:6.0f} ms')
+        log.warning('\n'.join(lines))
+
+
+def describe(frame):
+    """Returns the outermost watched method on the stack, the innermost frame and the formatted stack"""
+    innermost = frame
+    slot = 'outside MainWindow and FavoriteWidget'
+    while frame is not None:
+        owner = frame.f_locals.get('self')
+        if type(owner).__name__ in WATCHED:
+            slot = f'{type(owner).__name__}.{frame.f_code.co_name}'
+        frame = frame.f_back
+    location = f'{os.path.basename(innermost.f_code.co_filename)}:{innermost.f_lineno} ' \
+               f'in {innermost.f_code.co_name}'
+    return slot, location, traceback.format_stack(innermost)
+
+
+def start(app):
+    """Starts watching the event loop of app if the watchdog is enabled, the summary is logged at quit"""
+    global watchdog
+    if not enabled or watchdog is not None:
+        return
+    watchdog = StallWatchdog(parent=app)
+    app.aboutToQuit.connect(watchdog.stop)
+    app.aboutToQuit.connect(watchdog.report)
+    watchdog.start()
@@ -0,0 +1,79 @@
+import os
+
+from PyQt5 import QtCore
+
+from App.scanner import AUDIO_EXTENSIONS, scan_folder, walk
+
+DEBOUNCE_INTERVAL = 1000  # ms of quiet after the last change before a batch is reported
+
+
+class FolderWatcher(QtCore.QObject):
+    """Watches scanned folders and reports added and removed audio files in debounced batches"""
+
+    changed = QtCore.pyqtSignal(list, list)  # added paths, removed paths
+
+    def __init__(self, folder_paths, file_paths, parent=None, extensions=AUDIO_EXTENSIONS,
+                 interval=DEBOUNCE_INTERVAL):
+        super(FolderWatcher, self).__init__(parent)
+        self.extensions = extensions
+        self.files = {folder_path: set() for folder_path in folder_paths}  # folder -> audio files directly in it
+        for file_path in file_paths:
+            self.files.setdefault(os.path.dirname(file_path), set()).add(file_path)
+        self.dirty = set()
+
+        self.watcher = QtCore.QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self.mark_dirty)
+        if self.files:
+            self.watcher.addPaths(list(self.files))
+
+        # every change restarts the timer, so a burst of events is applied once
+        self.timer = QtCore.QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(interval)
+        self.timer.timeout.connect(self.apply)
+
+    def mark_dirty(self, folder_path):
+        self.dirty.add(folder_path)
+        self.timer.start()
+
+    def apply(self):
+        dirty, self.dirty = self.dirty, set()
+        added, removed = [], []
+        for folder_path in sorted(dirty):
+            self.rescan(folder_path, added, removed)
+        if added or removed:
+            self.changed.emit(added, removed)
+
+    def rescan(self, folder_path, added, removed):
+        known = self.files.get(folder_path)
+        if known is None:  # already dropped together with a removed parent
+            return
+        try:
+            folder_paths, files = scan_folder(folder_path, self.extensions)
+        except OSError:
+            self.forget(folder_path, removed)
+            return
+
+        for path in folder_paths:
+            if path not in self.files:
+                self.watch_tree(path, added)
+        current = {entry.path for entry in files}
+        added.extend(sorted(current - known))
+        removed.extend(known - current)
+        self.files[folder_path] = current
+
+    def watch_tree(self, folder_path, added):
+        """Starts watching a new folder with its subfolders and reports the files inside"""
+        for folder_path, entries in walk(folder_path, self.extensions):
+            files = {entry.path for entry in entries}
+            self.files[folder_path] = files
+            self.watcher.addPath(folder_path)
+            added.extend(sorted(files))
+
+    def forget(self, folder_path, removed):
+        """Drops a vanished folder with all its subfolders"""
+        prefix = folder_path + os.sep
+        gone = [path for path in self.files if path == folder_path or path.startswith(prefix)]
+        for path in gone:
+            removed.extend(self.files.pop(path))
+        self.watcher.removePaths(gone)
@@ -0,0 +1,217 @@
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import blake2b
+
+import numpy as np
+from PyQt5 import QtCore
+
+from App.tracing import timed
+
+PEAKS_PATH = 'App/peaks'  # sidecar folder of peak files, one per track
+PEAKS_LIMIT = 16 * 1024 * 1024  # bytes kept in the folder, least recently shown tracks are dropped first
+BUCKETS = 2048  # min/max pairs of the finest zoom level
+ZOOM = 4  # each coarser level has this many times fewer buckets
+LEVELS = 3
+MAGIC = b'PEAKS1'
+EXTENSIONS = ('.wav',)  # formats whose samples can be mapped without a decoder
+
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+def reduce(mins, maxs, count):
+    """Returns (mins, maxs) of count nearly equal buckets along the first axis"""
+    count = min(count, len(mins))
+    starts = np.arange(count, dtype=np.int64) * len(mins) // count
+    return np.minimum.reduceat(mins, starts, axis=0), np.maximum.reduceat(maxs, starts, axis=0)
+
+
+def read_wav_header(file):
+    """Returns (format, channels, bits, data offset, data size) of a RIFF WAVE file, or None"""
+    riff, _, wave = struct.unpack('<4sI4s', file.read(12))
+    if riff != b'RIFF' or wave != b'WAVE':
+        return None
+    fmt = None
+    while True:
+        header = file.read(8)
+        if len(header) < 8:
+            return None
+        chunk_id, size = struct.unpack('<4sI', header)
+        if chunk_id == b'fmt ':
+            data = file.read(size + size % 2)
+            tag, channels, _, _, _, bits = struct.unpack('<HHIIHH', data[:16])
+            if tag == WAVE_FORMAT_EXTENSIBLE and size >= 26:
+                tag = struct.unpack('<H', data[24:26])[0]  # first bytes of the sub-format GUID
+            fmt = tag, channels, bits
+        elif chunk_id == b'data':
+            if fmt is None:
+                return None
+            offset = file.tell()
+            return (*fmt, offset, min(size, os.fstat(file.fileno()).st_size - offset))
+        else:
+            file.seek(size + size % 2, os.SEEK_CUR)
+
+
+@timed('waveform.compute')
+def compute_peaks(file_path):
+    """Returns [(mins, maxs)] as int8 arrays from the finest level to the coarsest, None for unsupported files.
+
+    The samples are memory-mapped and reduced with NumPy, so the file is never decoded into memory.
+    24-bit audio is reduced over the most significant byte of each sample, which is all int8 peaks keep.
+    """
+    if not file_path.lower().endswith(EXTENSIONS):
+        return None
+    with open(file_path, 'rb') as file:
+        header = read_wav_header(file)
+    if header is None:
+        return None
+    tag, channels, bits, offset, size = header
+    if tag == WAVE_FORMAT_PCM and bits in (8, 16, 32):
+        dtype, scale = (np.uint8, 128) if bits == 8 else (f'<i{bits // 8}', 2 ** (bits - 1))
+    elif tag == WAVE_FORMAT_PCM and bits == 24:
+        dtype, scale = np.int8, 128  # the most significant byte of each sample
+    elif tag == WAVE_FORMAT_IEEE_FLOAT and bits == 32:
+        dtype, scale = '<f4', 1.0
+    else:
+        return None
+    frame_size = channels * bits // 8
+    frames = size // frame_size if channels else 0
+    if frames == 0:
+        return None
+
+    if bits == 24:
+        samples = np.memmap(file_path, dtype, 'r', offset, (frames * frame_size,))[2::3]
+    else:
+        samples = np.memmap(file_path, dtype, 'r', offset, (frames * channels,))
+    samples = samples.reshape(frames, channels)
+    mins, maxs = reduce(samples, samples, BUCKETS)
+    del samples  # unmaps the file
+    mins, maxs = mins.min(axis=1).astype(np.float32), maxs.max(axis=1).astype(np.float32)
+    if bits == 8:
+        mins, maxs = mins - 128, maxs - 128
+
+    levels = [tuple(np.clip(np.round(values / scale * 127), -127, 127).astype(np.int8) for values in (mins, maxs))]
+    for _ in range(LEVELS - 1):
+        levels.append(reduce(*levels[-1], len(levels[-1][0]) // ZOOM or 1))
+    return levels
+
+
+def identity(file_path):
+    """Cache key of a file, it changes whenever the file is replaced or rewritten"""
+    stat = os.stat(file_path)
+    return blake2b(f'{file_path}\0{stat.st_size}\0{stat.st_mtime_ns}'.encode('utf-8', 'surrogateescape'),
+                   digest_size=16).hexdigest()
+
+
+class PeakCache:
+    """Peak files in a sidecar folder, named by file identity: a level count, then bucket counts and int8 pairs"""
+
+    def __init__(self, folder_path=PEAKS_PATH, limit=PEAKS_LIMIT):
+        self.folder_path = folder_path
+        self.limit = limit
+
+    def path(self, key):
+        return os.path.join(self.folder_path, f'{key}.peaks')
+
+    def get(self, key):
+        try:
+            with open(self.path(key), 'rb') as file:
+                data = file.read()
+            os.utime(self.path(key))  # the modification time orders eviction
+        except OSError:
+            return None
+        try:
+            return self.parse(data)
+        except (struct.error, ValueError, IndexError):  # truncated or corrupt, computed again on the next request
+            try:
+                os.remove(self.path(key))
+            except OSError:
+                pass
+            return None
+
+    def parse(self, data):
+        if not data.startswith(MAGIC):
+            raise ValueError('not a peaks file')
+        levels, position = [], len(MAGIC) + 1
+        for _ in range(data[len(MAGIC)]):
+            count = struct.unpack_from('<I', data, position)[0]
+            pairs = np.frombuffer(data, np.int8, count * 2, position + 4).reshape(2, count)
+            levels.append((pairs[0], pairs[1]))
+            position += 4 + count * 2
+        if not levels or position != len(data):
+            raise ValueError('peaks file has trailing or missing data')
+        return levels
+
+    def store(self, key, levels):
+        os.makedirs(self.folder_path, exist_ok=True)
+        data = MAGIC + bytes([len(levels)]) + b''.join(struct.pack('<I', len(mins)) + mins.tobytes() + maxs.tobytes()
+                                                      for mins, maxs in levels)
+        temporary = self.path(key) + '.tmp'
+        with open(temporary, 'wb') as file:
+            file.write(data)
+        os.replace(temporary, self.path(key))
+        self.evict()
+
+    def evict(self):
+        """Deletes the least recently used peak files until the folder fits into the limit"""
+        entries = []
+        with os.scandir(self.folder_path) as iterator:
+            for entry in iterator:
+                if entry.name.endswith('.peaks'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.limit:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+
+class PeakLoader(QtCore.QObject):
+    """Hands out cached peaks right away and computes missing ones on a background thread"""
+
+    loaded = QtCore.pyqtSignal(str, object)  # file path, levels or None if the file has no peaks
+
+    def __init__(self, parent=None, cache=None):
+        super(PeakLoader, self).__init__(parent)
+        self.cache = cache or PeakCache()
+        self.executor = ThreadPoolExecutor(1, thread_name_prefix='peaks')
+        self.wanted = None  # only the latest request is computed, skipped tracks are not
+
+    def get(self, file_path):
+        """Returns cached peaks of file_path, or None and loads them in the background"""
+        if not file_path.lower().endswith(EXTENSIONS):
+            return None
+        try:
+            key = identity(file_path)
+        except OSError:
+            return None
+        levels = self.cache.get(key)
+        if levels is None:
+            self.wanted = file_path
+            self.executor.submit(self.compute, file_path, key)
+        return levels
+
+    def compute(self, file_path, key):
+        if file_path != self.wanted:
+            return
+        try:
+            levels = compute_peaks(file_path)
+        except (OSError, ValueError, struct.error):
+            levels = None
+        if levels is not None:
+            try:
+                self.cache.store(key, levels)
+            except OSError:  # e.g. a full disk, the peaks are still shown
+                pass
+        self.loaded.emit(file_path, levels)  # delivered through the GUI thread's event loop
+
+    def cancel(self):
+        self.wanted = None
+
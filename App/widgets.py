@@ -1,11 +1,15 @@
 import webbrowser
 
+import numpy as np
 from PyQt5 import QtCore, QtGui
-from PyQt5.QtCore import QRect
-from PyQt5.QtWidgets import QWidget, QTableWidgetItem
-from tinytag import TinyTag
+from PyQt5.QtCore import QRect, QLineF
+from PyQt5.QtGui import QStandardItem, QStandardItemModel
+from PyQt5.QtWidgets import QWidget, QLineEdit, QCompleter, QSlider, QStyle, QStyleOptionSlider
 
-from App.database import AudiofileDao
+from App.database import AudiofileDao, TrackDao
+from App.models import FavoritesModel
+from App.waveform import reduce
+from App.worker import get_worker
 from App.resources.ui.PropertiesWidget import Ui_PropertiesWidget
 from App.resources.ui.VolumeWidget import Ui_VolumeWidget
 from App.resources.ui.AboutWidget import Ui_AboutWidget
@@ -14,13 +18,14 @@ from App.__version__ import __version__
 
 
 class PropertiesWidget(QWidget, Ui_PropertiesWidget):
-    def __init__(self, x, y, height, file_path):
+    def __init__(self, x, y, height, file_path, prefetcher):
         super(PropertiesWidget, self).__init__()
         self.setupUi(self)
 
         self.setGeometry(x, y, self.width(), height)
 
         self.file_path = file_path
+        self.prefetcher = prefetcher
         self.load_properties()
 
     def paintEvent(self, event):
@@ -33,14 +38,30 @@ class PropertiesWidget(QWidget, Ui_PropertiesWidget):
         painter.end()
 
     def load_properties(self):
-        tag = TinyTag.get(self.file_path)
+        """Tags are read on the prefetch threads, a file that has to be parsed never blocks the database worker"""
+        self.file_text.setText(self.file_path)
+        self.prefetcher.loaded.connect(self.show_loaded)  # before get(), a load that fails at once emits right away
+        loaded = self.prefetcher.get(self.file_path)
+        if loaded is not None:
+            self.prefetcher.loaded.disconnect(self.show_loaded)
+            self.show_properties(loaded[0])
+
+    def show_loaded(self, file_path, future):
+        if file_path != self.file_path:
+            return
+        self.prefetcher.loaded.disconnect(self.show_loaded)
+        if future.exception() is not None:
+            self.title_text.setText('Error: file is not available!')
+        else:
+            self.show_properties(future.result()[0])
 
-        title = tag.title
-        authors = tag.artist
-        album = tag.album
-        genre = tag.genre
-        year = tag.year
-        length = str(f'{int(tag.duration / 60)}:{int(tag.duration % 60) + 1:02}')
+    def show_properties(self, track):
+        title = track.title
+        authors = track.artist
+        album = track.album
+        genre = track.genre
+        year = track.year
+        length = str(f'{int(track.duration / 60)}:{int(track.duration % 60) + 1:02}')
 
         self.title_text.setText(title)
         try:
@@ -51,7 +72,6 @@ class PropertiesWidget(QWidget, Ui_PropertiesWidget):
         self.genre_text.setText(genre)
         self.year_text.setText(year)
         self.length_text.setText(length)
-        self.file_text.setText(self.file_path)
 
 
 class VolumeWidget(QWidget, Ui_VolumeWidget):
@@ -88,38 +108,152 @@ class FavoriteWidget(QWidget, Ui_FavoriteWidget):
         self.dao = AudiofileDao()
         self.main_widget = main_widget
         self.user_id = user_id
-        self.load_table()
+        self.model = FavoritesModel(user_id, self)
+        self.table.setModel(self.model)
+        # sorting is applied by the model, enabling it also performs the first load
+        self.table.horizontalHeader().setSortIndicator(0, QtCore.Qt.AscendingOrder)
+        self.table.setSortingEnabled(True)
+        self.table.doubleClicked.connect(self.queue_favorite)
 
         self.reload_button.clicked.connect(self.load_table)
         self.play_button.clicked.connect(self.play_favorites)
         self.delete_button.clicked.connect(self.delete_all)
 
-    def get_data(self):
-        return self.dao.get_all(self.user_id)
-
     def load_table(self):
-        data = self.get_data()
-
-        self.table.setColumnCount(2)
-        self.table.setHorizontalHeaderLabels(['title', 'author'])
-        self.table.setRowCount(len(data))
-        for row in range(len(data)):
-            for col in range(2):
-                self.table.setItem(row, col, QTableWidgetItem(str(data[row][col + 1])))
+        self.model.reload()
 
     def play_favorites(self):
-        new_playlist = []
-        for song in self.get_data():
-            new_playlist.append(song[3])
-        if not new_playlist:
+        """Plays the favorites in the order the list is sorted in"""
+        get_worker().submit(self.dao.get_paths, self.user_id, self.model.order_by, self.model.descending,
+                            callback=self.start_playlist)
+
+    def start_playlist(self, file_paths):
+        if not file_paths:
             self.main_widget.set_error('Error: No favorite music!')
         else:
-            self.main_widget.playlist = new_playlist
-            self.main_widget.cursor = 0
+            self.main_widget.set_playlist(file_paths)
             self.main_widget.play()
             self.main_widget.update_metadata()
 
+    def queue_favorite(self, index):
+        """Plays the double-clicked favorite after the current track"""
+        file_path = self.model.file_path(index.row())
+        if file_path is not None:
+            self.main_widget.play_next(file_path)
+
     def delete_all(self):
-        for song in self.get_data():
-            self.dao.delete(song[3])
-        self.load_table()
+        get_worker().submit(self.dao.delete_all_for_user, self.user_id, callback=lambda result: self.load_table())
+
+
+class SearchBox(QLineEdit):
+    """Search-as-you-type over the library index, results are offered in a completer popup"""
+
+    selected = QtCore.pyqtSignal(str)  # file path of the chosen result
+
+    DELAY = 150  # ms of typing pause before a query is sent
+    LIMIT = 50
+
+    def __init__(self, parent=None):
+        super(SearchBox, self).__init__(parent)
+        self.setPlaceholderText('Search')
+        self.setClearButtonEnabled(True)
+        self.setStyleSheet('color: rgb(0, 0, 0); background-color: rgb(255, 255, 255); border-radius: 5px;')
+
+        self.dao = TrackDao()
+        self.results = QStandardItemModel(self)
+        self.completer = QCompleter(self.results, self)
+        self.completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        self.completer.activated[QtCore.QModelIndex].connect(self.choose)
+        self.setCompleter(self.completer)
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(self.DELAY)
+        self.timer.timeout.connect(self.search)
+        self.textEdited.connect(self.timer.start)
+
+    def search(self):
+        text = self.text()
+        get_worker().submit(self.dao.search, text, self.LIMIT, callback=lambda rows: self.show_results(text, rows))
+
+    def show_results(self, text, rows):
+        if text != self.text():  # the user has typed on since
+            return
+        self.results.clear()
+        for file_path, title, artist, album in rows:
+            name = title if title else file_path[file_path.rfind('/') + 1:]
+            item = QStandardItem(f'{name} - {artist}' if artist else name)
+            item.setData(file_path, QtCore.Qt.UserRole)
+            self.results.appendRow(item)
+        if rows:
+            self.completer.complete()
+
+    def choose(self, index):
+        self.selected.emit(index.data(QtCore.Qt.UserRole))
+        QtCore.QTimer.singleShot(0, self.clear)
+
+
+class WaveformSlider(QSlider):
+    """Seek slider that draws the peaks of the track as its groove, a plain slider while none are known"""
+
+    HEIGHT = 28
+    PLAYED = QtGui.QColor(255, 255, 255)
+    REMAINING = QtGui.QColor(255, 255, 255, 102)
+
+    def __init__(self, parent=None):
+        super(WaveformSlider, self).__init__(QtCore.Qt.Horizontal, parent)
+        self.setMinimumHeight(self.HEIGHT)
+        self.levels = None  # [(mins, maxs)] from the finest zoom level to the coarsest
+        self.lines = []  # one vertical line per pixel column of the groove, built for its current geometry
+        self.lines_rect = None
+
+    @classmethod
+    def replace(cls, slider):
+        """Takes the place of a slider created by setupUi, keeping its name and style"""
+        waveform = cls(slider.parentWidget())
+        waveform.setObjectName(slider.objectName())
+        waveform.setStyleSheet(slider.styleSheet())
+        slider.parentWidget().layout().replaceWidget(slider, waveform)
+        slider.hide()
+        slider.deleteLater()
+        return waveform
+
+    def set_levels(self, levels):
+        self.levels = levels
+        self.lines_rect = None
+        self.update()
+
+    def build_lines(self, rect):
+        """Scales the zoom level closest to the groove width to one min/max pair per pixel"""
+        width = rect.width()
+        mins, maxs = next((level for level in reversed(self.levels) if len(level[0]) >= width), self.levels[0])
+        mins, maxs = reduce(mins, maxs, width)
+        columns = (np.arange(width) * len(mins) // width) if len(mins) < width else slice(None)
+        middle = rect.center().y() + 0.5
+        scale = (self.height() / 2 - 1) / 127
+        self.lines = [QLineF(rect.left() + x + 0.5, middle - high * scale, rect.left() + x + 0.5, middle - low * scale)
+                      for x, (low, high) in enumerate(zip(mins[columns].tolist(), maxs[columns].tolist()))]
+        self.lines_rect = rect
+
+    def paintEvent(self, event):
+        if self.levels is None:
+            super(WaveformSlider, self).paintEvent(event)
+            return
+
+        option = QStyleOptionSlider()
+        self.initStyleOption(option)
+        groove = self.style().subControlRect(QStyle.CC_Slider, option, QStyle.SC_SliderGroove, self)
+        handle = self.style().subControlRect(QStyle.CC_Slider, option, QStyle.SC_SliderHandle, self)
+        if groove != self.lines_rect:
+            self.build_lines(groove)
+        played = max(0, handle.center().x() - groove.left())
+
+        painter = QtGui.QPainter(self)
+        painter.setRenderHint(QtGui.QPainter.Antialiasing)
+        painter.setPen(self.PLAYED)
+        painter.drawLines(self.lines[:played])
+        painter.setPen(self.REMAINING)
+        painter.drawLines(self.lines[played:])
+        painter.setPen(QtCore.Qt.NoPen)
+        painter.setBrush(self.PLAYED)
+        painter.drawEllipse(QtCore.QRectF(handle).center(), 4, 4)
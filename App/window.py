@@ -0,0 +1,588 @@
+import webbrowser
+from functools import lru_cache
+from itertools import islice
+
+from PyQt5 import QtCore
+from PyQt5.QtGui import QPixmap, QImage, QIcon, QPalette
+from PyQt5.QtMultimedia import QMediaPlayer, QMediaContent
+from PyQt5.QtWidgets import QMainWindow, QFileDialog, QAction, QActionGroup, QInputDialog, \
+    QMenu
+
+from App.cache import ArtworkCache, TrackCache
+from App.image import DEFAULT_IMAGE_PATH, to_qimage
+from App.playback import GaplessPlayer
+from App.playlist import Playlist, PlayOrder, END_POLICIES, ADVANCE, ONCE, REPEAT, STOP
+from App.prefetch import Prefetcher
+from App.scanner import FolderScanner
+from App.tracing import span, timed
+from App.waveform import PeakLoader
+from App.watcher import FolderWatcher
+from App.database import AudiofileDao, PlaylistDao
+from App.indexer import BackgroundIndexer
+from App.m3u import import_m3u, write_m3u
+from App.worker import get_worker
+from App.widgets import VolumeWidget, PropertiesWidget, AboutWidget, FavoriteWidget, SearchBox, WaveformSlider
+
+from App.resources.ui.MainWindow import Ui_MainWindow
+
+ICONS_PATH = 'App/resources/icons'
+NO_FILE_ERROR = 'Error: file not selected!'
+
+
+@lru_cache(maxsize=None)
+def icon(name):
+    """Loads an icon on first use, so that no SVG is parsed before the window needs it"""
+    return QIcon(f'{ICONS_PATH}/{name}.svg')
+
+
+class MainWindow(QMainWindow, Ui_MainWindow):
+    def __init__(self, user_id):
+        super(MainWindow, self).__init__()
+        self.setupUi(self)
+        self.song_slider = WaveformSlider.replace(self.song_slider)
+
+        self.user_id = user_id
+        self.playlist = Playlist()
+        self.cursor = 0  # current audio index in playlist
+        self.order = PlayOrder()  # picks the index that plays after the current one
+        self.player = GaplessPlayer(self)
+        self.armed_cursor = None  # playlist index loaded into the second player
+        self.end_policy = ADVANCE
+        self.audio_dao = AudiofileDao()
+        self.playlist_dao = PlaylistDao()
+        self.track_cache = TrackCache(ArtworkCache())
+        self.prefetcher = Prefetcher(self.track_cache)
+        self.indexer = BackgroundIndexer()  # makes scanned files searchable
+        self.scanner = None
+        self.watcher = None
+        self.library_folders = []  # folders of the opened library, known once a scan has finished
+        self.peak_loader = PeakLoader(self)
+
+        self.player.positionChanged.connect(self.update_slider)
+        self.player.positionChanged.connect(self.update_time)
+        self.player.durationChanged.connect(self.update_duration)
+        self.player.mediaStatusChanged.connect(self.end_of_media)
+        self.player.preloadRequested.connect(self.arm_next)
+        self.player.advanced.connect(self.advanced)
+        self.peak_loader.loaded.connect(self.show_peaks)
+        self.prefetcher.loaded.connect(self.show_loaded)
+        self.main_button.clicked.connect(self.select_func)
+        self.like_button.clicked.connect(self.like)
+        self.volume_button.clicked.connect(self.open_volume_widget)
+        self.playlist_button.clicked.connect(self.open_favorites_widget)
+        self.open_file_action.triggered.connect(self.open_file)
+        self.open_folder_action.triggered.connect(self.open_folder)
+        self.properties_action.triggered.connect(self.open_properties_widget)
+        self.support_action.triggered.connect(lambda: webbrowser.open('https://skosarevv.t.me'))
+        self.about_action.triggered.connect(self.open_about_widget)
+        self.next_button.clicked.connect(self.next)
+        self.prev_button.clicked.connect(self.previous)
+        self.song_slider.sliderReleased.connect(self.slider_released)
+        self.setFixedSize(450, 750)
+
+        self.watch_action = QAction('Watch Folder', self)
+        self.watch_action.setCheckable(True)
+        self.watch_action.toggled.connect(self.set_watching)
+        self.menuOpen.addAction(self.watch_action)
+
+        self.gapless_action = QAction('Gapless Playback', self)
+        self.gapless_action.setCheckable(True)
+        self.gapless_action.setChecked(self.player.gapless)
+        self.gapless_action.toggled.connect(self.set_gapless)
+        self.menuTrack.addAction(self.gapless_action)
+
+        self.shuffle_action = QAction('Shuffle', self)
+        self.shuffle_action.setCheckable(True)
+        self.shuffle_action.toggled.connect(self.set_shuffle)
+        self.menuTrack.addAction(self.shuffle_action)
+
+        self.search_box = SearchBox(self)
+        self.search_box.setFixedWidth(180)
+        self.search_box.selected.connect(self.play_search_result)
+        self.menubar.setCornerWidget(self.search_box)
+
+        self.menuPlaylist = QMenu('Playlist', self.menubar)
+        self.menubar.insertMenu(self.menuHelp.menuAction(), self.menuPlaylist)
+        self.menuPlaylist.addAction('Save...', self.save_playlist)
+        self.menuPlaylist.addAction('Load...', self.load_playlist)
+        self.menuPlaylist.addAction('Import M3U...', self.import_playlist)
+        self.menuPlaylist.addAction('Export M3U...', self.export_playlist)
+
+        self.end_policy_menu = self.menuTrack.addMenu('At Track End')
+        self.end_policy_group = QActionGroup(self)
+        for policy, text in END_POLICIES.items():
+            action = self.end_policy_menu.addAction(text)
+            action.setCheckable(True)
+            action.setChecked(policy == self.end_policy)
+            action.triggered.connect(lambda checked, policy=policy: self.set_end_policy(policy))
+            self.end_policy_group.addAction(action)
+
+    def select_func(self):
+        """Selects the desired function: play, pause or resume"""
+        if not self.playlist:
+            self.set_error(NO_FILE_ERROR)
+            return
+        self.set_error(None)
+        state = self.player.state()
+        if state == QMediaPlayer.StoppedState:
+            self.play()
+        elif state == QMediaPlayer.PlayingState:
+            self.pause()
+        elif state == QMediaPlayer.PausedState:
+            self.resume()
+
+    @timed('play')
+    def play(self):
+        url = QtCore.QUrl.fromLocalFile(self.playlist[self.cursor])
+        with span('play.set_media'):
+            self.player.setMedia(QMediaContent(url))
+        self.main_button.setIcon(icon('pause'))
+        with span('play.start'):
+            self.player.play()
+        self.current_time_label.setText('0:00')
+        self.song_slider.setSliderPosition(0)
+
+    def pause(self):
+        self.player.pause()
+        self.main_button.setIcon(icon('play'))
+
+    def resume(self):
+        self.player.play()
+        self.main_button.setIcon(icon('pause'))
+
+    def stop(self):
+        self.player.stop()
+        self.playlist = Playlist()  # a new object, a save or an export may still be reading the old one
+        self.order.reset(0)
+        self.close_library()
+        self.main_button.setIcon(icon('play'))
+
+    def next(self):
+        if self.playlist:
+            self.go_to(self.order.next())
+
+    def previous(self):
+        if self.playlist:
+            self.go_to(self.order.previous())
+
+    def go_to(self, index):
+        """Plays the entry the play order has moved to, None means the order has run out"""
+        if index is None:
+            self.player.stop()
+            self.show_stopped()
+            return
+        self.cursor = index
+        self.update_metadata()
+        self.play()
+
+    def show_stopped(self):
+        self.main_button.setIcon(icon('play'))
+        self.song_slider.setSliderPosition(0)
+        self.update_time(0)
+
+    def arm_next(self):
+        """Pre-loads the upcoming track, so that it starts without a gap"""
+        if not self.playlist or self.end_policy == STOP:
+            return
+        if self.end_policy == REPEAT:
+            self.armed_cursor = self.cursor
+        else:
+            upcoming = self.order.peek()
+            if not upcoming:
+                return
+            self.armed_cursor = upcoming[0]
+        self.player.arm(QtCore.QUrl.fromLocalFile(self.playlist[self.armed_cursor]))
+
+    def advanced(self):
+        """The pre-loaded track has started playing"""
+        if self.end_policy != REPEAT:
+            self.order.next()
+        self.cursor = self.armed_cursor
+        self.armed_cursor = None
+        self.update_metadata()
+        self.current_time_label.setText('0:00')
+        self.song_slider.setSliderPosition(0)
+
+    def set_end_policy(self, policy):
+        self.end_policy = policy
+        self.order.wrap = policy != ONCE
+        self.player.disarm()
+
+    def set_shuffle(self, enabled):
+        self.order.set_shuffle(enabled)
+        self.player.disarm()
+        if self.playlist:
+            self.prefetch_neighbours()
+
+    def play_next(self, file_path):
+        """Queues a track to play after the current one, adding it to the playlist if needed"""
+        if not self.playlist:
+            self.set_playlist([file_path])
+            self.update_metadata()
+            return
+        index = self.add_entry(file_path)
+        self.order.play_next(index)
+        self.player.disarm()  # the armed track is no longer the next one
+        self.prefetch_neighbours()
+        self.statusbar.showMessage(f'Playing next: {file_path[file_path.rfind("/") + 1:]}', 5000)
+
+    def add_entry(self, file_path):
+        """Returns the playlist index of file_path, appending it if it is not in the playlist"""
+        try:
+            return self.playlist.index(file_path)
+        except ValueError:
+            self.playlist.append(file_path)
+            self.order.grow(len(self.playlist))
+            return len(self.playlist) - 1
+
+    def set_gapless(self, enabled):
+        self.player.gapless = enabled
+        if not enabled:
+            self.player.disarm()
+
+    def like(self):
+        """Adds or removes a song from favorites"""
+        file_path = self.playlist[self.cursor]
+        get_worker().submit(self.audio_dao.toggle, self.user_id, self.title_label.text(), self.author_label.text(),
+                            file_path, callback=lambda liked: self.show_liked(file_path, liked))
+
+    def show_liked(self, file_path, liked):
+        """Sets the like icon, unless the answer arrived after the track was switched"""
+        if self.playlist and self.playlist[self.cursor] == file_path:
+            self.like_button.setIcon(icon('dislike') if liked else icon('like'))
+
+    def end_of_media(self, status):
+        """Applies the end policy once the player reports that the track has finished"""
+        if status != QMediaPlayer.EndOfMedia or not self.playlist:
+            return
+        if self.end_policy in (ADVANCE, ONCE):
+            self.next()
+        elif self.end_policy == REPEAT:
+            self.play()
+        else:
+            self.show_stopped()
+
+    def open_file(self):
+        file_path = \
+            QFileDialog.getOpenFileName(self, 'Select audio file', '', 'Audio (*.mp3 *.wav);;All files (*)')[0]
+        if file_path == '':
+            return
+
+        self.stop()
+        self.playlist.append(file_path)
+        self.set_error(None)
+        self.cursor = 0
+        self.order.reset(1, 0)
+        self.update_metadata()
+
+    def open_folder(self):
+        folder_path = QFileDialog.getExistingDirectory(self, 'Select folder')
+        if folder_path == '':
+            return
+        with span('open_folder.stop'):
+            self.stop()
+        self.set_error(None)
+
+        with span('open_folder.start_scan'):
+            self.scanner = FolderScanner(folder_path, self)
+            self.scanner.found.connect(self.add_to_playlist)
+            self.scanner.progress.connect(self.show_scan_progress)
+            self.scanner.finished.connect(self.scan_finished)
+            self.scanner.finished.connect(self.scanner.deleteLater)
+            self.scanner.start()
+
+    @timed('open_folder.add_batch')
+    def add_to_playlist(self, file_paths):
+        """Appends a batch of scanned files, the first batch becomes playable right away"""
+        if self.sender() is not self.scanner:  # batch of a cancelled scan
+            return
+        was_empty = not self.playlist
+        self.playlist.extend(file_paths)
+        self.indexer.add(file_paths)
+        if was_empty:
+            self.cursor = 0
+            self.order.reset(len(self.playlist), 0)
+            self.update_metadata()
+        else:
+            self.order.grow(len(self.playlist))
+
+    def show_scan_progress(self, files, folders):
+        if self.sender() is not self.scanner:
+            return
+        self.statusbar.showMessage(f'Scanning: {files} files in {folders} folders')
+
+    def scan_finished(self):
+        if self.sender() is not self.scanner:
+            return
+        self.library_folders = self.scanner.folder_paths
+        self.scanner = None
+        self.statusbar.showMessage(f'{len(self.playlist)} files in playlist', 5000)
+        if not self.playlist:
+            self.update_metadata()
+        self.set_watching(self.watch_action.isChecked())
+
+    def set_watching(self, enabled):
+        """Toggles incremental playlist updates for the opened folder"""
+        if self.watcher is not None:
+            self.watcher.deleteLater()
+            self.watcher = None
+        if enabled and self.library_folders:
+            self.watcher = FolderWatcher(self.library_folders, self.playlist, self)
+            self.watcher.changed.connect(self.apply_library_changes)
+
+    def apply_library_changes(self, added, removed):
+        """Applies files added to or removed from the watched folder without a rescan"""
+        if removed:
+            gone = set(removed)
+            current = self.playlist[self.cursor] if self.playlist else None
+            kept_before = sum(1 for path in islice(self.playlist, self.cursor) if path not in gone)
+            self.playlist = Playlist(path for path in self.playlist if path not in gone)
+            self.cursor = min(kept_before, max(len(self.playlist) - 1, 0))
+            # indices have shifted, so queue, history and shuffle start over from the current track
+            self.order.reset(len(self.playlist), self.cursor if self.playlist else None)
+            get_worker().submit(self.track_cache.forget, removed)
+            self.prefetcher.clear()
+            self.player.disarm()
+            if current in gone:
+                if self.player.state() != QMediaPlayer.StoppedState:
+                    self.player.stop()
+                    self.main_button.setIcon(icon('play'))
+                self.update_metadata()
+
+        was_empty = not self.playlist
+        self.playlist.extend(added)
+        self.indexer.add(added)
+        if was_empty and self.playlist:
+            self.order.reset(len(self.playlist), 0)
+            self.update_metadata()
+        else:
+            self.order.grow(len(self.playlist))
+        self.statusbar.showMessage(f'{len(added)} files added, {len(removed)} removed', 5000)
+
+    def close_library(self):
+        """Cancels scanning, watching and prefetching for the current playlist"""
+        if self.scanner is not None:
+            # stops within one directory entry and then deletes itself, nothing waits for it here
+            self.scanner.cancel()
+            self.scanner.found.disconnect(self.add_to_playlist)
+            self.scanner.progress.disconnect(self.show_scan_progress)
+            self.scanner.finished.disconnect(self.scan_finished)
+            self.scanner = None
+        self.library_folders = []
+        self.set_watching(False)
+        self.prefetcher.clear()
+        self.indexer.cancel()
+        self.player.disarm()
+
+    def closeEvent(self, event):
+        self.close_library()
+        for scanner in self.findChildren(FolderScanner):
+            scanner.wait()  # cancelled scans still running, a running QThread must not be destroyed
+        super(MainWindow, self).closeEvent(event)
+
+    def set_error(self, msg):
+        if msg is None:
+            self.error_label.hide()
+        else:
+            self.error_label.setText(msg)
+            self.error_label.show()
+            # timer for auto-hide in 5 seconds
+            self.error_timer = QtCore.QTimer()
+            self.error_timer.start(5000)
+            self.error_timer.timeout.connect(lambda: self.set_error(None))
+
+    def save_playlist(self):
+        if not self.playlist:
+            self.set_error(NO_FILE_ERROR)
+            return
+        name, ok = QInputDialog.getText(self, 'Save playlist', 'Name:')
+        if ok and name.strip():
+            get_worker().submit(self.playlist_dao.save_as, self.user_id, name.strip(), list(self.playlist),
+                                callback=lambda count: self.statusbar.showMessage(f'Saved {count} files', 5000))
+
+    def load_playlist(self):
+        get_worker().submit(self.playlist_dao.get_all, self.user_id, callback=self.choose_playlist)
+
+    def choose_playlist(self, playlists):
+        if not playlists:
+            self.set_error('Error: No saved playlists!')
+            return
+        items = [f'{name} ({count})' for playlist_id, name, count in playlists]
+        item, ok = QInputDialog.getItem(self, 'Load playlist', 'Playlist:', items, 0, False)
+        if ok:
+            self.open_saved_playlist(playlists[items.index(item)][0])
+
+    def open_saved_playlist(self, playlist_id):
+        # the generator runs its query on the worker thread, where the entries are read
+        get_worker().submit(lambda: Playlist(self.playlist_dao.entries(playlist_id)), callback=self.start_playlist)
+
+    def start_playlist(self, playlist):
+        if not playlist:
+            self.set_error('Error: The playlist is empty!')
+            return
+        self.stop()
+        self.set_error(None)
+        self.set_playlist(playlist)
+        self.update_metadata()
+
+    def import_playlist(self):
+        m3u_path = QFileDialog.getOpenFileName(self, 'Select playlist', '', 'Playlists (*.m3u *.m3u8)')[0]
+        if m3u_path == '':
+            return
+        self.statusbar.showMessage('Importing playlist...')
+        get_worker().submit(import_m3u, self.user_id, m3u_path, callback=self.playlist_imported,
+                            error=lambda exception: self.set_error('Error: cannot read the playlist!'))
+
+    def playlist_imported(self, result):
+        playlist_id, name, count = result
+        self.statusbar.showMessage(f'Imported {count} files as "{name}"', 5000)
+        self.open_saved_playlist(playlist_id)
+
+    def export_playlist(self):
+        if not self.playlist:
+            self.set_error(NO_FILE_ERROR)
+            return
+        m3u_path = QFileDialog.getSaveFileName(self, 'Export playlist', 'playlist.m3u8',
+                                               'Playlists (*.m3u8 *.m3u)')[0]
+        if m3u_path == '':
+            return
+        get_worker().submit(write_m3u, m3u_path, list(self.playlist),
+                            callback=lambda result: self.statusbar.showMessage('Playlist exported', 5000),
+                            error=lambda exception: self.set_error('Error: cannot write the playlist!'))
+
+    def slider_released(self):
+        self.player.setPosition(self.song_slider.value())
+        self.update_time(self.song_slider.value())
+
+    def show_peaks(self, file_path, levels):
+        """Peaks computed in the background, shown if their track is still the current one"""
+        if self.playlist and self.playlist[self.cursor] == file_path:
+            self.song_slider.set_levels(levels)
+
+    def update_slider(self, pos):
+        if not self.song_slider.isSliderDown():
+            self.song_slider.setValue(pos)
+
+    def update_duration(self, duration):
+        self.song_slider.setMaximum(duration)
+
+    def update_time(self, pos):
+        current_time = str(f'{int(pos / 60000)}:{int((pos / 1000) % 60):02}')
+        self.current_time_label.setText(current_time)
+
+    @timed('update_metadata')
+    def update_metadata(self):
+        if not self.playlist:
+            self.image.setPixmap(QPixmap.fromImage(QImage(DEFAULT_IMAGE_PATH)))
+            self.title_label.setText('')
+            self.author_label.setText('')
+            self.song_slider.set_levels(None)
+            return
+
+        file_path = self.playlist[self.cursor]
+        with span('update_metadata.prefetched'):
+            loaded = self.prefetcher.get(file_path)
+        if loaded is not None:
+            self.show_track(file_path, *loaded)  # otherwise shown by show_loaded once the prefetcher has read it
+
+        with span('update_metadata.peaks'):
+            self.song_slider.set_levels(self.peak_loader.get(file_path))
+
+        # set icon for like button
+        get_worker().submit(self.audio_dao.is_liked, self.user_id, file_path,
+                            callback=lambda liked: self.show_liked(file_path, liked))
+
+        with span('update_metadata.schedule_prefetch'):
+            self.prefetch_neighbours()
+
+    def show_loaded(self, file_path, future):
+        """Tags and cover read in the background, shown if their track is still the current one"""
+        if not self.playlist or self.playlist[self.cursor] != file_path:
+            return
+        if future.exception() is not None:
+            self.set_error('Error: file is not available!')
+            return
+        self.show_track(file_path, *future.result())
+
+    def show_track(self, file_path, track, artwork):
+        cover, colors = artwork
+
+        # raw data
+        title = track.title
+        authors = track.artist
+        duration = track.duration
+
+        # validation
+        if title is None:
+            title = file_path[file_path.rfind('/') + 1:]
+        if len(title) > 35:
+            title = title[0:35] + '...'
+
+        if authors:
+            authors = ', '.join(authors.split('/'))
+            if len(authors) > 35:
+                authors = authors[0:35] + '...'
+
+        # set metadata
+        with span('update_metadata.labels'):
+            self.update_slider(self.player.position())
+            self.update_time(self.player.position())
+            self.title_label.setText(title)
+            self.title_label.show()
+            self.author_label.setText(authors if authors else 'Unknown author')
+            self.author_label.show()
+            self.end_time_label.setText(str(f'{int(duration / 60)}:{int(duration % 60) + 1:02}'))
+        with span('update_metadata.pixmap'):
+            self.image.setPixmap(QPixmap.fromImage(to_qimage(cover)))
+
+        # set background color
+        with span('update_metadata.style'):
+            self.setStyleSheet(f'background-color: rgb({colors[0]}, {colors[1]}, {colors[2]});')
+
+    def prefetch_neighbours(self):
+        """Loads the entries the play order would move to next, several of them while shuffling"""
+        self.prefetcher.schedule([self.playlist[index] for index in self.order.neighbours()])
+
+    def play_search_result(self, file_path):
+        """Jumps to the found track, appending it to the playlist if it is not in it yet"""
+        self.cursor = self.add_entry(file_path)
+        self.order.jump(self.cursor)
+        self.set_error(None)
+        self.update_metadata()
+        self.play()
+
+    def set_playlist(self, playlist):
+        """Replaces the playlist and drops work prefetched for the old one"""
+        self.close_library()
+        self.playlist = playlist if isinstance(playlist, Playlist) else Playlist(playlist)
+        self.cursor = 0
+        self.order.reset(len(self.playlist), 0)
+
+    def open_volume_widget(self):
+        x = self.x()
+        y = self.y() + self.height() + 80
+        width = self.width()
+        color = self.palette().color(QPalette.Background)
+        self.volume_widget = VolumeWidget(self.player, x, y, width, color)
+        self.volume_widget.show()
+
+    def open_properties_widget(self):
+        if len(self.playlist) == 0:
+            self.set_error(NO_FILE_ERROR)
+            return
+
+        self.set_error(None)
+        x = self.x() + self.width() + 10
+        y = self.y() + 37
+        height = self.height()
+        file_path = self.playlist[self.cursor]
+        self.properties_widget = PropertiesWidget(x, y, height, file_path, self.prefetcher)
+        self.properties_widget.show()
+
+    def open_about_widget(self):
+        self.about_widget = AboutWidget()
+        self.about_widget.show()
+
+    def open_favorites_widget(self):
+        self.favorite_widget = FavoriteWidget(self, self.user_id)
+        self.favorite_widget.show()
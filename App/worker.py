@@ -0,0 +1,58 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from PyQt5 import QtCore
+
+synchronous = False  # run database calls inline, for tests and scripts without an event loop
+
+
+class DatabaseWorker(QtCore.QObject):
+    """Runs DAO calls on a dedicated thread and hands the results back to the GUI thread.
+
+    Calls are queued and executed one at a time in submission order, so a commit never
+    stalls the event loop and a read always sees the writes submitted before it.
+    """
+
+    done = QtCore.pyqtSignal(object, object, object)  # future, callback, error callback
+
+    def __init__(self, synchronous=False):
+        super(DatabaseWorker, self).__init__()
+        self.synchronous = synchronous
+        self.executor = None if synchronous else ThreadPoolExecutor(1, thread_name_prefix='database')
+        # emitted from the database thread, delivered through the GUI thread's event loop
+        self.done.connect(self.deliver, QtCore.Qt.QueuedConnection)
+
+    def submit(self, func, *args, callback=None, error=None):
+        """Queues func(*args); callback(result) or error(exception) is later called on the GUI thread"""
+        if self.synchronous:
+            future = Future()
+            try:
+                future.set_result(func(*args))
+            except Exception as exception:
+                future.set_exception(exception)
+            self.deliver(future, callback, error)
+            return future
+
+        future = self.executor.submit(func, *args)
+        future.add_done_callback(lambda result: self.done.emit(result, callback, error))
+        return future
+
+    def deliver(self, future, callback, error):
+        exception = future.exception()
+        if exception is None:
+            if callback is not None:
+                callback(future.result())
+        elif error is not None:
+            error(exception)
+        else:
+            raise exception
+
+
+worker = None
+
+
+def get_worker():
+    """Returns the process-wide database worker"""
+    global worker
+    if worker is None:
+        worker = DatabaseWorker(synchronous)
+    return worker
@@ -0,0 +1,84 @@
+"""Auto-advance latency of MainWindow: from EndOfMedia of one track to audible playback of the next.
+
+Plays short generated WAV files back to back, with and without gapless mode.
+Needs a working QtMultimedia backend, or --fake to play through bench_gapless.FakePlayer without one.
+Run from the repository root:  py -m benchmarks.bench_advance [--fake]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from unittest import mock
+
+from PyQt5 import QtCore
+from PyQt5.QtMultimedia import QMediaPlayer
+from PyQt5.QtWidgets import QApplication
+
+import App.database
+from App.database import migrate
+from benchmarks.bench_gapless import FakePlayer, write_tone
+
+TRACKS = 6
+TRACK_SECONDS = 1
+
+
+def measure(app, window, files, gapless):
+    window.gapless_action.setChecked(gapless)
+    window.set_playlist(list(files))
+    window.update_metadata()
+    latencies = []
+    marks = {}
+
+    def on_status(status):
+        if status == QMediaPlayer.EndOfMedia:
+            marks['end'] = time.perf_counter()
+
+    def on_position(position):
+        if 'end' in marks and position > 0:
+            latencies.append(time.perf_counter() - marks.pop('end'))
+
+    for player in window.player.players:
+        player.mediaStatusChanged.connect(on_status)
+    window.player.positionChanged.connect(on_position)
+
+    window.play()
+    deadline = time.perf_counter() + TRACKS * TRACK_SECONDS * 3
+    while len(latencies) < TRACKS - 1 and time.perf_counter() < deadline:
+        app.processEvents(QtCore.QEventLoop.AllEvents, 1)
+
+    window.player.stop()
+    for player in window.player.players:
+        player.mediaStatusChanged.disconnect(on_status)
+    window.player.positionChanged.disconnect(on_position)
+    return sorted(latency * 1000 for latency in latencies)
+
+
+def main():
+    app = QApplication(sys.argv)
+    with tempfile.TemporaryDirectory() as folder:
+        App.database.db_path = os.path.join(folder, 'audioplayer.db')
+        migrate(sqlite3.connect(App.database.db_path))
+        files = []
+        for i in range(TRACKS):
+            files.append(os.path.join(folder, f'{i}.wav'))
+            write_tone(files[-1], seconds=TRACK_SECONDS, frequency=330 + 110 * i)
+
+        from App.window import MainWindow
+        window = MainWindow(1)
+        if '--fake' in sys.argv[1:]:
+            with mock.patch('App.playback.QMediaPlayer', FakePlayer):
+                window.player.players  # created while the player class is swapped
+        window.player.setNotifyInterval(10)  # the first position after a switch marks playback, so report it early
+        for gapless in (False, True):
+            latencies = measure(app, window, files, gapless)
+            if not latencies:
+                print(f'gapless={gapless}: no transitions observed')
+                continue
+            median = latencies[len(latencies) // 2]
+            print(f'gapless={gapless!s:<6} transitions {len(latencies)}, median {median:7.1f} ms, '
+                  f'max {latencies[-1]:7.1f} ms' + ('' if len(latencies) == TRACKS - 1 else ' (some missed)'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Row-by-row favorites writes against the bulk AudiofileDao APIs at 1k/10k/100k rows.
+
+Run from the repository root:  py -m benchmarks.bench_bulk
+"""
+import os
+import sqlite3
+import tempfile
+import time
+
+import App.database
+from App.database import AudiofileDao, migrate
+
+SIZES = (1000, 10000, 100000)
+LEGACY_LIMIT = 10000  # row-by-row deletes scan the table per row, above this they take many minutes
+USER_ID = 1
+
+
+def legacy_save_each(con, songs):
+    """The previous save(): SELECT, INSERT and a commit for every song"""
+    for title, author, file_path in songs:
+        query = 'SELECT id, title, author, file_path FROM audiofile WHERE user_id = ? AND file_path = ?'
+        if con.execute(query, (USER_ID, file_path)).fetchone() is None:
+            query = 'INSERT INTO audiofile(user_id, title, author, file_path) VALUES (?, ?, ?, ?)'
+            con.execute(query, (USER_ID, title, author, file_path))
+            con.commit()
+
+
+def legacy_delete_each(con):
+    """The previous delete_all(): one DELETE and a commit per favorite"""
+    query = 'SELECT id, title, author, file_path FROM audiofile WHERE user_id = ?'
+    for song in con.execute(query, (USER_ID,)).fetchall():
+        con.execute('DELETE FROM audiofile WHERE file_path = ?', (song[3],))
+        con.commit()
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    with tempfile.TemporaryDirectory() as folder:
+        App.database.db_path = os.path.join(folder, 'audioplayer.db')
+        migrate(sqlite3.connect(App.database.db_path))
+        dao = AudiofileDao()
+        con = App.database.get_connection()
+
+        print(f'{"rows":>7}{"save each, s":>14}{"save_many, s":>14}{"delete each, s":>16}{"delete all, s":>15}')
+        for size in SIZES:
+            songs = [(f'title {i}', f'author {i % 300}', f'/music/album {i // 12}/{i}.mp3') for i in range(size)]
+            if size <= LEGACY_LIMIT:
+                save_each = f'{timed(legacy_save_each, con, songs):.3f}'
+                delete_each = f'{timed(legacy_delete_each, con):.3f}'
+            else:
+                save_each = delete_each = 'skipped'
+            save_many = timed(dao.save_many, USER_ID, songs)
+            delete_all = timed(dao.delete_all_for_user, USER_ID)
+            print(f'{size:>7}{save_each:>14}{save_many:>14.3f}{delete_each:>16}{delete_all:>15.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Per-call latency of the theme color engine.
+
+Run from the repository root:  py -m benchmarks.bench_color
+"""
+import io
+import timeit
+
+from PIL import Image
+
+from App.image import find_average_color
+
+
+def legacy_average_color(image):
+    """The per-pixel loop that find_average_color replaced, kept for comparison"""
+    pixels = image.load()
+    x, y = image.size
+    r_sum, g_sum, b_sum = 0, 0, 0
+    for i in range(x):
+        for j in range(y):
+            r_sum += pixels[i, j][0]
+            g_sum += pixels[i, j][1]
+            b_sum += pixels[i, j][2]
+    square = x * y
+    return [int(r_sum / square), int(g_sum / square), int(b_sum / square)]
+
+
+def make_cover(size, mode='RGB', fmt='JPEG'):
+    """Returns encoded bytes of a noisy cover, like the ones embedded into audio files"""
+    image = Image.effect_noise((size, size), 64).convert('RGB')
+    image = Image.blend(image, Image.new('RGB', (size, size), (200, 90, 30)), 0.5)
+    if mode != 'RGB':
+        image = image.convert(mode)
+    buffer = io.BytesIO()
+    image.save(buffer, fmt)
+    return buffer.getvalue()
+
+
+def measure(func, repeat=20):
+    timings = timeit.repeat(func, number=1, repeat=repeat)
+    timings.sort()
+    return timings[len(timings) // 2] * 1000, timings[-1] * 1000
+
+
+def main():
+    cases = [
+        ('340x340 RGB JPEG', make_cover(340)),
+        ('340x340 RGBA PNG', make_cover(340, 'RGBA', 'PNG')),
+        ('340x340 P PNG', make_cover(340, 'P', 'PNG')),
+        ('340x340 L JPEG', make_cover(340, 'L')),
+        ('3000x3000 RGB JPEG', make_cover(3000)),
+    ]
+    print(f'{"case":<22}{"median, ms":>12}{"max, ms":>10}')
+    for name, data in cases:
+        median, worst = measure(lambda: find_average_color(Image.open(io.BytesIO(data))))
+        print(f'{name:<22}{median:>12.2f}{worst:>10.2f}')
+
+    decoded = Image.open(io.BytesIO(cases[0][1])).convert('RGB')
+    median, worst = measure(lambda: legacy_average_color(decoded), repeat=3)
+    print(f'{"legacy 340x340 loop":<22}{median:>12.2f}{worst:>10.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""Like/unlike and favorites loading while other threads write, with per-DAO connections and with
+the shared WAL connection layer.
+
+Run from the repository root:  py -m benchmarks.bench_database
+"""
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+import App.database
+from App.database import AudiofileDao, SongException, migrate
+
+FAVORITES = 5000
+WRITERS = 3
+DURATION = 3.0  # seconds per configuration
+
+
+class LegacyAudiofileDao(AudiofileDao):
+    """The previous setup: a fresh default-journaled connection per DAO instance"""
+
+    def __init__(self):
+        self.legacy_con = sqlite3.connect(App.database.db_path)
+
+    @property
+    def con(self):
+        return self.legacy_con
+
+
+def create_db(path):
+    App.database.db_path = path
+    con = sqlite3.connect(path)
+    migrate(con)
+    con.executemany('INSERT INTO audiofile(user_id, title, author, file_path) VALUES (1, ?, ?, ?)',
+                    [(f'title {i}', f'author {i % 100}', f'/music/{i}.mp3') for i in range(FAVORITES)])
+    con.commit()
+    con.close()
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)] * 1000 if values else float('nan')
+
+
+def run(dao_class):
+    stop = threading.Event()
+    like_timings, errors, failures = [], [], []
+
+    def writer(number):
+        dao = dao_class()
+        i = 0
+        try:
+            while not stop.is_set():
+                path = f'/liked/{number}/{i % 50}.mp3'
+                start = time.perf_counter()
+                try:
+                    dao.save(2, 'title', 'author', path)
+                except SongException:
+                    dao.delete(2, path)
+                except sqlite3.OperationalError as error:
+                    errors.append(error)
+                like_timings.append(time.perf_counter() - start)
+                i += 1
+        except Exception as exception:  # a dead writer would leave the other threads' numbers looking valid
+            failures.append(exception)
+            stop.set()
+
+    threads = [threading.Thread(target=writer, args=(number,)) for number in range(WRITERS)]
+    for thread in threads:
+        thread.start()
+
+    load_timings = []
+    reader = dao_class()
+    deadline = time.perf_counter() + DURATION
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        reader.get_all(1)
+        load_timings.append(time.perf_counter() - start)
+
+    stop.set()
+    for thread in threads:
+        thread.join()
+    if failures:
+        raise RuntimeError(f'{len(failures)} of {WRITERS} writers failed') from failures[0]
+    return like_timings, load_timings, errors
+
+
+def main():
+    with tempfile.TemporaryDirectory() as folder:
+        for name, dao_class in (('per-DAO connections', LegacyAudiofileDao), ('shared WAL layer', AudiofileDao)):
+            create_db(os.path.join(folder, f'{dao_class.__name__}.db'))
+            likes, loads, errors = run(dao_class)
+            print(f'{name}: {len(likes) / DURATION:8.0f} like/unlike per s '
+                  f'(p50 {percentile(likes, 0.5):.2f} ms, p95 {percentile(likes, 0.95):.2f} ms), '
+                  f'favorites load p50 {percentile(loads, 0.5):.2f} ms, p95 {percentile(loads, 0.95):.2f} ms, '
+                  f'{len(errors)} lock errors')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""Time to open the favorites window for a large collection, until the first rows are painted.
+
+Run from the repository root:  py -m benchmarks.bench_favorites
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+from PyQt5 import QtCore
+from PyQt5.QtWidgets import QApplication
+
+import App.database
+from App.database import AudiofileDao, migrate
+
+SIZES = (1000, 100000)
+USER_ID = 1
+
+
+def open_time(app, size):
+    from App.widgets import FavoriteWidget
+
+    start = time.perf_counter()
+    widget = FavoriteWidget(None, USER_ID)
+    widget.show()
+    model = widget.model
+    while not (model.rowCount() and model.data(model.index(0, 0))):
+        app.processEvents(QtCore.QEventLoop.AllEvents, 1)
+    app.processEvents()
+    elapsed = time.perf_counter() - start
+    assert model.total == size
+    widget.close()
+    return elapsed
+
+
+def main():
+    app = QApplication(sys.argv)
+    with tempfile.TemporaryDirectory() as folder:
+        App.database.db_path = os.path.join(folder, 'audioplayer.db')
+        migrate(sqlite3.connect(App.database.db_path))
+        dao = AudiofileDao()
+        saved = 0
+        for size in SIZES:
+            dao.save_many(USER_ID, ((f'title {i}', f'author {i % 300}', f'/music/{i}.mp3') for i in range(saved, size)))
+            saved = size
+            timings = sorted(open_time(app, size) * 1000 for _ in range(5))
+            print(f'{size:>7} favorites: open median {timings[2]:.1f} ms, max {timings[-1]:.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
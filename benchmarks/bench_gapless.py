@@ -0,0 +1,229 @@
+"""Gap between two consecutive tracks with a single QMediaPlayer and with GaplessPlayer.
+
+Needs a working QtMultimedia backend. With --fake the players are replaced by FakePlayer, which plays
+by the clock, so the hand-over of GaplessPlayer is measured without a backend or a sound card.
+Run from the repository root:  py -m benchmarks.bench_gapless [--fake]
+"""
+import math
+import os
+import struct
+import sys
+import tempfile
+import time
+import wave
+from unittest import mock
+
+from PyQt5 import QtCore
+from PyQt5.QtMultimedia import QMediaPlayer, QMediaContent
+from PyQt5.QtWidgets import QApplication
+
+from App.playback import GaplessPlayer
+
+TRACK_SECONDS = 2
+RUNS = 5
+FAKE_LOAD_DELAY = 100  # ms FakePlayer takes to open a file, standing in for the backend opening and buffering it
+
+
+def write_tone(path, seconds=TRACK_SECONDS, frequency=440, rate=44100):
+    with wave.open(path, 'wb') as file:
+        file.setnchannels(1)
+        file.setsampwidth(2)
+        file.setframerate(rate)
+        samples = (int(8000 * math.sin(2 * math.pi * frequency * i / rate)) for i in range(seconds * rate))
+        file.writeframes(b''.join(struct.pack('<h', sample) for sample in samples))
+
+
+class FakePlayer(QtCore.QObject):
+    """The part of QMediaPlayer the player uses, playing WAV files by the clock instead of through a backend"""
+
+    StoppedState, PlayingState, PausedState = \
+        QMediaPlayer.StoppedState, QMediaPlayer.PlayingState, QMediaPlayer.PausedState
+    NoMedia, LoadingMedia, LoadedMedia, BufferedMedia, EndOfMedia = \
+        QMediaPlayer.NoMedia, QMediaPlayer.LoadingMedia, QMediaPlayer.LoadedMedia, QMediaPlayer.BufferedMedia, \
+        QMediaPlayer.EndOfMedia
+
+    mediaStatusChanged = QtCore.pyqtSignal(int)
+    stateChanged = QtCore.pyqtSignal(int)
+    positionChanged = QtCore.pyqtSignal('qint64')
+    durationChanged = QtCore.pyqtSignal('qint64')
+
+    def __init__(self, parent=None):
+        super(FakePlayer, self).__init__(parent)
+        self.status = self.NoMedia
+        self.playing = self.StoppedState
+        self.file_path = None
+        self.length = 0
+        self.offset = 0  # position when the clock was last started
+        self.level = 100
+        self.clock = QtCore.QElapsedTimer()
+        self.ticker = QtCore.QTimer(self)
+        self.ticker.setInterval(1000)
+        self.ticker.timeout.connect(self.tick)
+        self.loader = QtCore.QTimer(self)
+        self.loader.setSingleShot(True)
+        self.loader.timeout.connect(self.load)
+
+    def setMedia(self, content):
+        self.ticker.stop()
+        self.loader.stop()
+        self.offset = self.length = 0
+        self.set_state(self.StoppedState)
+        url = content.canonicalUrl()
+        self.file_path = None if url.isEmpty() else url.toLocalFile()
+        if self.file_path is None:
+            self.set_status(self.NoMedia)
+        else:
+            self.set_status(self.LoadingMedia)
+            self.loader.start(FAKE_LOAD_DELAY)
+
+    def load(self):
+        with wave.open(self.file_path, 'rb') as file:
+            self.length = file.getnframes() * 1000 // file.getframerate()
+        self.durationChanged.emit(self.length)
+        self.set_status(self.LoadedMedia)
+        if self.playing == self.PlayingState:
+            self.start_clock()
+
+    def play(self):
+        if self.status == self.EndOfMedia:
+            self.offset = 0
+            self.status = self.LoadedMedia
+        self.set_state(self.PlayingState)
+        if self.status == self.LoadedMedia:
+            self.start_clock()
+
+    def pause(self):
+        self.offset = self.position()
+        self.ticker.stop()
+        self.set_state(self.PausedState)
+
+    def stop(self):
+        self.ticker.stop()
+        self.offset = 0
+        self.set_state(self.StoppedState)
+
+    def start_clock(self):
+        self.clock.start()
+        self.ticker.start()
+        self.set_status(self.BufferedMedia)
+
+    def tick(self):
+        position = self.position()
+        self.positionChanged.emit(position)
+        if position >= self.length:
+            self.ticker.stop()
+            self.offset = self.length
+            self.set_state(self.StoppedState)
+            self.set_status(self.EndOfMedia)
+
+    def set_state(self, state):
+        if state != self.playing:
+            self.playing = state
+            self.stateChanged.emit(state)
+
+    def set_status(self, status):
+        if status != self.status:
+            self.status = status
+            self.mediaStatusChanged.emit(status)
+
+    def state(self):
+        return self.playing
+
+    def mediaStatus(self):
+        return self.status
+
+    def position(self):
+        if self.ticker.isActive():
+            return min(self.offset + self.clock.elapsed(), self.length)
+        return self.offset
+
+    def setPosition(self, position):
+        self.offset = position
+        if self.ticker.isActive():
+            self.clock.start()
+
+    def duration(self):
+        return self.length
+
+    def volume(self):
+        return self.level
+
+    def setVolume(self, volume):
+        self.level = volume
+
+    def setNotifyInterval(self, interval):
+        self.ticker.setInterval(interval)
+
+
+def wait(app, condition, timeout=TRACK_SECONDS * 5):
+    deadline = time.perf_counter() + timeout
+    while not condition() and time.perf_counter() < deadline:
+        app.processEvents(QtCore.QEventLoop.AllEvents, 1)
+    return condition()
+
+
+def single_player_gap(app, first, second, player_class=QMediaPlayer):
+    """The old path: setMedia on the same player once the previous file has ended"""
+    player = player_class()
+    player.setNotifyInterval(10)
+    marks = {}
+
+    def on_status(status):
+        if status == QMediaPlayer.EndOfMedia and 'end' not in marks:
+            marks['end'] = time.perf_counter()
+            player.setMedia(QMediaContent(QtCore.QUrl.fromLocalFile(second)))
+            player.play()
+
+    def on_position(position):
+        if 'end' in marks and position > 0 and 'start' not in marks:
+            marks['start'] = time.perf_counter()
+
+    player.mediaStatusChanged.connect(on_status)
+    player.positionChanged.connect(on_position)
+    player.setMedia(QMediaContent(QtCore.QUrl.fromLocalFile(first)))
+    player.play()
+    wait(app, lambda: 'start' in marks)
+    player.stop()
+    return marks['start'] - marks['end'] if 'start' in marks else math.nan
+
+
+def gapless_player_gap(app, first, second, player_class=QMediaPlayer):
+    player = GaplessPlayer()
+    with mock.patch('App.playback.QMediaPlayer', player_class):
+        player.players  # created while the player class is swapped
+    player.setNotifyInterval(10)
+    marks = {}
+    outgoing = player.active
+
+    def on_status(status):
+        if status == QMediaPlayer.EndOfMedia and 'end' not in marks:
+            marks['end'] = time.perf_counter()
+
+    def on_position(position):
+        if 'end' in marks and player.active is not outgoing and position > 0 and 'start' not in marks:
+            marks['start'] = time.perf_counter()
+
+    outgoing.mediaStatusChanged.connect(on_status)
+    player.positionChanged.connect(on_position)
+    player.preloadRequested.connect(lambda: player.arm(QtCore.QUrl.fromLocalFile(second)))
+    player.setMedia(QMediaContent(QtCore.QUrl.fromLocalFile(first)))
+    player.play()
+    wait(app, lambda: 'start' in marks)
+    player.stop()
+    return marks['start'] - marks['end'] if 'start' in marks else math.nan
+
+
+def main():
+    app = QApplication(sys.argv)
+    player_class = FakePlayer if '--fake' in sys.argv[1:] else QMediaPlayer
+    with tempfile.TemporaryDirectory() as folder:
+        first, second = os.path.join(folder, 'first.wav'), os.path.join(folder, 'second.wav')
+        write_tone(first, frequency=440)
+        write_tone(second, frequency=660)
+        for name, measure in (('single player', single_player_gap), ('gapless player', gapless_player_gap)):
+            gaps = sorted(measure(app, first, second, player_class) * 1000 for _ in range(RUNS))
+            print(f'{name:<16} median gap {gaps[len(gaps) // 2]:7.1f} ms, max {gaps[-1]:7.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
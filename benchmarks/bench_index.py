@@ -0,0 +1,48 @@
+"""Throughput of the headless indexer over a synthetic library by number of worker processes, and of a resumed run.
+
+Run from the repository root:  py -m benchmarks.bench_index [tracks]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+import App.database
+from App.database import migrate
+from App.indexer import Indexer
+from benchmarks.library import generate
+
+
+def clear_caches():
+    con = App.database.get_connection()
+    con.execute('DELETE FROM track')
+    con.execute('DELETE FROM artwork')
+    con.commit()
+
+
+def main():
+    tracks = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    with tempfile.TemporaryDirectory() as folder:
+        root = os.path.join(folder, 'library')
+        generate(root, tracks)
+        App.database.db_path = os.path.join(folder, 'audioplayer.db')
+        migrate(sqlite3.connect(App.database.db_path))
+
+        workers, baseline = 1, None
+        while workers <= os.cpu_count():
+            clear_caches()
+            start = time.perf_counter()
+            Indexer(root, workers, out=None).run()
+            rate = tracks / (time.perf_counter() - start)
+            baseline = baseline or rate
+            print(f'{workers:>3} workers: {rate:8.0f} files/s  speedup {rate / baseline:5.2f}x')
+            workers *= 2
+
+        start = time.perf_counter()
+        Indexer(root, out=None).run()
+        print(f'resumed run with nothing left to parse: {(time.perf_counter() - start) * 1000:.0f} ms')
+
+
+if __name__ == '__main__':
+    main()
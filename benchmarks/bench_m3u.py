@@ -0,0 +1,43 @@
+"""Streaming M3U import into a stored playlist and export back out.
+
+Run from the repository root:  py -m benchmarks.bench_m3u [lines]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import App.database
+from App.database import PlaylistDao, migrate
+from App.m3u import import_m3u, write_m3u
+
+ENTRIES = 50000
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else ENTRIES
+    with tempfile.TemporaryDirectory() as folder:
+        App.database.db_path = os.path.join(folder, 'audioplayer.db')
+        migrate(sqlite3.connect(App.database.db_path))
+
+        m3u_path = os.path.join(folder, 'library.m3u8')
+        write_m3u(m3u_path, (f'/home/user/Music/Artist {i // 120}/Album {i // 12}/{i % 12 + 1:02} Song {i}.mp3'
+                             for i in range(count)))
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        playlist_id, name, imported = import_m3u(1, m3u_path)
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f'import {imported} entries: {elapsed:.2f} s, peak {peak / 2 ** 20:.1f} MB')
+
+        start = time.perf_counter()
+        write_m3u(os.path.join(folder, 'export.m3u8'), PlaylistDao().entries(playlist_id))
+        print(f'export {imported} entries: {time.perf_counter() - start:.2f} s')
+
+
+if __name__ == '__main__':
+    main()
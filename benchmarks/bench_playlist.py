@@ -0,0 +1,66 @@
+"""Memory of the compact playlist against a plain list of path strings.
+
+Run from the repository root:  py -m benchmarks.bench_playlist [entries ...]
+"""
+import random
+import sys
+import time
+import tracemalloc
+
+from App.playlist import Playlist
+
+SIZES = (100000, 1000000)
+ROOT = '/home/user/Music/Library'
+
+
+def library(count):
+    """Paths shaped like a real library: artist and album folders with ten to fifteen tracks each"""
+    random.seed(0)
+    produced = album = 0
+    while produced < count:
+        folder = f'{ROOT}/Artist {album // 4:05}/Album {album:06} (Deluxe Edition)'
+        for track in range(min(random.randint(10, 15), count - produced)):
+            yield f'{folder}/{track + 1:02} - Some Song Title {produced}.mp3'
+            produced += 1
+        album += 1
+
+
+def measure(build):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size, elapsed
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    for count in sizes:
+        plain, plain_size, plain_time = measure(lambda: list(library(count)))
+        compact, compact_size, compact_time = measure(lambda: Playlist(library(count)))
+        print(f'{count} entries: list {plain_size / 2 ** 20:7.1f} MB in {plain_time:.2f} s, '
+              f'compact {compact_size / 2 ** 20:6.1f} MB in {compact_time:.2f} s '
+              f'({len(compact.folders)} folders, {plain_size / compact_size:.1f}x smaller)')
+
+        assert compact[count // 2] == plain[count // 2] and compact[-1] == plain[-1]
+        probes = random.sample(range(count), 1000)
+        start = time.perf_counter()
+        for index in probes:
+            compact[index]
+        print(f'  index: {(time.perf_counter() - start) / len(probes) * 1e6:.2f} us per entry', end='')
+        start = time.perf_counter()
+        for index in probes[:100]:
+            assert compact.index(plain[index]) == index
+        print(f', lookup by path: {(time.perf_counter() - start) / 100 * 1000:.2f} ms '
+              f'(list: ', end='')
+        start = time.perf_counter()
+        for index in probes[:100]:
+            plain.index(plain[index])
+        print(f'{(time.perf_counter() - start) / 100 * 1000:.2f} ms)')
+        del plain, compact
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""Prefix search latency of the FTS5 library index.
+
+Run from the repository root:  py -m benchmarks.bench_search [tracks]
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+import App.database
+from App.database import TrackDao, get_connection, migrate
+
+TRACKS = 500000
+QUERIES = ('a', 'be', 'lov', 'love so', 'album 12', 'artist 7 ti', 'zzz')
+
+WORDS = ('love', 'night', 'song', 'blue', 'heart', 'dream', 'fire', 'rain', 'light', 'beat', 'road', 'sky')
+
+
+def seed(count):
+    random.seed(0)
+    rows = []
+    for i in range(count):
+        title = ' '.join(random.choices(WORDS, k=3)) + f' {i}'
+        artist, album = f'artist {i % 5000}', f'album {i % 40000}'
+        rows.append((f'/music/{artist}/{album}/{i:06} {title}.mp3', i, i, title, artist, album, None, None, 200.0, None))
+    con = get_connection()
+    start = time.perf_counter()
+    con.executemany('INSERT INTO track(file_path, mtime, size, title, artist, album, genre, year, duration, artwork) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+    con.commit()
+    return time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else TRACKS
+    with tempfile.TemporaryDirectory() as folder:
+        App.database.db_path = os.path.join(folder, 'audioplayer.db')
+        migrate(sqlite3.connect(App.database.db_path))
+        print(f'indexed {count} tracks in {seed(count):.1f} s')
+
+        dao = TrackDao()
+        for text in QUERIES:
+            timings = []
+            for _ in range(20):
+                start = time.perf_counter()
+                results = dao.search(text, 50)
+                timings.append(time.perf_counter() - start)
+            timings.sort()
+            print(f'{text!r:<15} {len(results):>3} results, median {timings[10] * 1000:6.2f} ms, '
+                  f'max {timings[-1] * 1000:6.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""Cost of starting a shuffle and stepping through it, against shuffling a copy of the playlist.
+
+Run from the repository root:  py -m benchmarks.bench_shuffle [entries]
+"""
+import random
+import sys
+import time
+
+from App.playlist import PlayOrder
+
+ENTRIES = 1000000
+STEPS = 10000
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else ENTRIES
+    playlist = [f'/music/artist {i % 5000}/{i:07}.mp3' for i in range(count)]
+
+    start = time.perf_counter()
+    shuffled = playlist[:]
+    random.shuffle(shuffled)
+    print(f'copy and shuffle {count} entries: {(time.perf_counter() - start) * 1000:8.1f} ms')
+
+    order = PlayOrder(len(playlist))
+    order.jump(0)
+    start = time.perf_counter()
+    order.set_shuffle(True)
+    first = playlist[order.next()]
+    print(f'start lazy shuffle, first track:  {(time.perf_counter() - start) * 1000:8.3f} ms  ({first})')
+
+    timings = []
+    for _ in range(STEPS):
+        begin = time.perf_counter()
+        order.next()
+        order.peek(4)
+        timings.append(time.perf_counter() - begin)
+    timings.sort()
+    print(f'{STEPS} steps with lookahead: median {timings[STEPS // 2] * 1e6:.1f} us, '
+          f'max {timings[-1] * 1e6:.1f} us, {len(order.permutation.swapped)} swaps stored')
+
+    start = time.perf_counter()
+    for _ in range(STEPS):
+        order.previous()
+    for _ in range(STEPS):
+        order.next()
+    print(f'{STEPS} steps back and forward: {(time.perf_counter() - start) * 1000:.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""Cold start: time from process start to the first paint of the login dialog and of the player window.
+
+Every run is a fresh interpreter started with -X importtime, the slowest imports before the first
+paint and those of the player window are listed afterwards.
+Run from the repository root:  py -m benchmarks.bench_startup [runs]
+"""
+import json
+import os
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+RUNS = 5
+TOP_IMPORTS = 10
+PAINTED = '-- first paint'  # written to stderr by the child, splits the import log
+
+
+def child(db_path):
+    from PyQt5 import QtCore
+    from PyQt5.QtWidgets import QApplication
+
+    import App.database
+    from App.__main__ import LoginDialog
+
+    App.database.db_path = db_path
+    app = QApplication(sys.argv)
+    marks = {}
+
+    class PaintProbe(QtCore.QObject):
+        def __init__(self, name, then):
+            super(PaintProbe, self).__init__()
+            self.name = name
+            self.then = then
+
+        def eventFilter(self, watched, event):
+            if event.type() == QtCore.QEvent.Paint and self.name not in marks:
+                marks[self.name] = time.time()
+                QtCore.QTimer.singleShot(0, self.then)
+            return False
+
+    def open_window():
+        sys.stderr.write(PAINTED + '\n')
+        sys.stderr.flush()
+        start = time.time()
+        from App.window import MainWindow
+        marks['window imported'] = time.time() - start + marks['login']
+        window = MainWindow(1)
+        probes.append(PaintProbe('window', app.quit))
+        window.installEventFilter(probes[-1])
+        window.show()
+        dialog.hide()
+        windows.append(window)
+
+    dialog = LoginDialog()
+    probes = [PaintProbe('login', open_window)]
+    windows = []
+    dialog.installEventFilter(probes[0])
+    dialog.show()
+    app.exec()
+    print(json.dumps(marks))
+
+
+def parse_imports(log):
+    """Top-level imports of an -X importtime log as (cumulative us, module), before and after the first paint"""
+    phases = [[], []]
+    phase = 0
+    for line in log.splitlines():
+        if line.startswith(PAINTED):
+            phase = 1
+        elif line.startswith('import time:') and '|' in line:
+            fields = line[len('import time:'):].split('|')
+            if fields[0].strip() == 'self [us]':
+                continue
+            name = fields[2].rstrip()
+            if not name.startswith('  '):  # nested imports are indented below their parent
+                phases[phase].append((int(fields[1]), name.strip()))
+    return [sorted(imports, reverse=True) for imports in phases]
+
+
+def main():
+    if len(sys.argv) > 2 and sys.argv[1] == '--child':
+        child(sys.argv[2])
+        return
+
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else RUNS
+    results = []
+    with tempfile.TemporaryDirectory() as folder:
+        db_path = os.path.join(folder, 'audioplayer.db')
+        from App.database import migrate  # not at the top, the children import this module while being timed
+        migrate(sqlite3.connect(db_path))
+        for _ in range(runs):
+            start = time.time()
+            process = subprocess.run([sys.executable, '-X', 'importtime', '-m', 'benchmarks.bench_startup',
+                                      '--child', db_path], capture_output=True, text=True)
+            if process.returncode != 0:
+                sys.exit(process.stderr)
+            marks = json.loads(process.stdout.splitlines()[-1])
+            results.append({name: (moment - start) * 1000 for name, moment in marks.items()})
+
+    for name in ('login', 'window imported', 'window'):
+        timings = sorted(result[name] for result in results)
+        print(f'{name:<16} median {statistics.median(timings):7.1f} ms, min {timings[0]:7.1f} ms')
+
+    before, after = parse_imports(process.stderr)
+    for title, imports in (('before the first paint', before), ('loaded for the player window', after)):
+        print(f'\nslowest imports {title} (cumulative):')
+        for cumulative, name in imports[:TOP_IMPORTS]:
+            print(f'  {cumulative / 1000:7.1f} ms  {name}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""Cost of waveform peaks for a long WAV: computing them over the memory-mapped samples, and reading them back.
+
+Run from the repository root:  py -m benchmarks.bench_waveform [minutes]
+"""
+import os
+import struct
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from App.waveform import PeakCache, compute_peaks, identity
+
+RATE = 44100
+
+
+def write_wav(path, minutes):
+    """16-bit stereo noise, written in one-minute blocks"""
+    frames = minutes * 60 * RATE
+    rng = np.random.default_rng(0)
+    with open(path, 'wb') as file:
+        file.write(b'RIFF' + struct.pack('<I', 36 + frames * 4) + b'WAVE')
+        file.write(b'fmt ' + struct.pack('<IHHIIHH', 16, 1, 2, RATE, RATE * 4, 4, 16))
+        file.write(b'data' + struct.pack('<I', frames * 4))
+        for _ in range(minutes):
+            file.write(rng.integers(-20000, 20000, 60 * RATE * 2, dtype=np.int16).tobytes())
+
+
+def main():
+    minutes = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'long.wav')
+        write_wav(path, minutes)
+        start = time.perf_counter()
+        levels = compute_peaks(path)
+        elapsed = time.perf_counter() - start
+        size = os.path.getsize(path) / 1024 / 1024
+        print(f'compute {minutes} min, {size:.0f} MB: {elapsed * 1000:8.1f} ms  ({size / elapsed:.0f} MB/s, page cache warm)')
+
+        cache = PeakCache(os.path.join(folder, 'peaks'))
+        key = identity(path)
+        cache.store(key, levels)
+        start = time.perf_counter()
+        for _ in range(100):
+            cache.get(identity(path))
+        print(f'cached peaks, {os.path.getsize(cache.path(key))} bytes: '
+              f'{(time.perf_counter() - start) * 10:8.3f} ms per read')
+
+
+if __name__ == '__main__':
+    main()
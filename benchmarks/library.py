@@ -0,0 +1,135 @@
+"""Synthetic audio library for the benchmarks: tagged MP3 and WAV files in nested folders, and a seeded DB.
+
+Everything is generated offline and deterministically from a seed, so two runs on different
+commits measure the same data. Can also be used on its own:
+
+    py -m benchmarks.library <folder> [tracks]
+"""
+import io
+import os
+import random
+import sqlite3
+import struct
+import sys
+
+from PIL import Image
+
+from App.database import migrate
+
+COVER_SIZE = 500  # px, typical for embedded artwork
+COVER_RATIO = 0.6  # share of albums with embedded artwork
+TRACKS_PER_ALBUM = 12
+ALBUMS_PER_ARTIST = 3
+MP3_FRAMES = 40  # ~1 s of 128 kbit/s MPEG-1 Layer III frames
+WAV_SECONDS = 1
+WAV_RATE = 8000
+GENRES = ('Rock', 'Jazz', 'Electronic', 'Classical', 'Hip-Hop', 'Folk')
+WORDS = ('love', 'night', 'song', 'blue', 'heart', 'dream', 'fire', 'rain', 'light', 'beat', 'road', 'sky')
+
+
+def synchsafe(number):
+    return bytes([(number >> 21) & 127, (number >> 14) & 127, (number >> 7) & 127, number & 127])
+
+
+def id3_tag(title, artist, album, genre, year, cover=None):
+    """ID3v2.3 tag with the text frames TinyTag reads and an optional front cover"""
+    def frame(frame_id, data):
+        return frame_id + struct.pack('>I', len(data)) + b'\0\0' + data
+
+    def text(value):
+        return b'\x01' + value.encode('utf-16')  # UTF-16 with BOM, so non-Latin names survive
+
+    body = frame(b'TIT2', text(title)) + frame(b'TPE1', text(artist)) + frame(b'TALB', text(album)) + \
+        frame(b'TCON', text(genre)) + frame(b'TYER', text(year))
+    if cover is not None:
+        body += frame(b'APIC', b'\0image/jpeg\0\x03\0' + cover)
+    body += b'\0' * (len(body) % 2)  # padding keeps the tag even-sized for RIFF chunks
+    return b'ID3\x03\x00\x00' + synchsafe(len(body)) + body
+
+
+def write_mp3(path, tag):
+    frame = b'\xff\xfb\x90\x64' + b'\0' * 413  # 128 kbit/s, 44.1 kHz, silent
+    with open(path, 'wb') as file:
+        file.write(tag + frame * MP3_FRAMES)
+
+
+def write_wav(path, tag):
+    """PCM WAV with the ID3 tag in an 'id3 ' chunk, where TinyTag and most players look for it"""
+    data = bytes(WAV_SECONDS * WAV_RATE * 2)
+    fmt = struct.pack('<HHIIHH', 1, 1, WAV_RATE, WAV_RATE * 2, 2, 16)
+    chunks = b'fmt ' + struct.pack('<I', len(fmt)) + fmt + b'data' + struct.pack('<I', len(data)) + data + \
+        b'id3 ' + struct.pack('<I', len(tag)) + tag
+    with open(path, 'wb') as file:
+        file.write(b'RIFF' + struct.pack('<I', 4 + len(chunks)) + b'WAVE' + chunks)
+
+
+def make_cover(rng, size=COVER_SIZE):
+    """Noisy JPEG cover in a random hue, decoding it costs about as much as real artwork"""
+    color = tuple(rng.randrange(256) for _ in range(3))
+    image = Image.blend(Image.effect_noise((size, size), 64).convert('RGB'), Image.new('RGB', (size, size), color), 0.6)
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=85)
+    return buffer.getvalue()
+
+
+def generate(folder, tracks, seed=0, cover_ratio=COVER_RATIO):
+    """Writes tracks files as <folder>/Artist/Album[/CD n]/NN Title.ext, returns their paths in scan order.
+
+    Every album shares one cover (or none), every third album is a WAV album and every
+    fifth one is split into CD folders, so the tree is a few levels deep.
+    """
+    rng = random.Random(seed)
+    paths = []
+    album = 0
+    while len(paths) < tracks:
+        artist = f'Artist {album // ALBUMS_PER_ARTIST:04}'
+        title_words = ' '.join(rng.choices(WORDS, k=2)).title()
+        album_name = f'{title_words} {album:05}'
+        genre = GENRES[album % len(GENRES)]
+        year = str(1970 + album % 50)
+        cover = make_cover(rng) if rng.random() < cover_ratio else None
+        extension, write = ('.wav', write_wav) if album % 3 == 2 else ('.mp3', write_mp3)
+
+        for number in range(min(TRACKS_PER_ALBUM, tracks - len(paths))):
+            album_folder = os.path.join(folder, artist, album_name)
+            if album % 5 == 4:
+                album_folder = os.path.join(album_folder, f'CD {number % 2 + 1}')
+            os.makedirs(album_folder, exist_ok=True)
+            title = ' '.join(rng.choices(WORDS, k=3)).capitalize()
+            path = os.path.join(album_folder, f'{number + 1:02} {title}{extension}')
+            write(path, id3_tag(title, artist, album_name, genre, year, cover))
+            paths.append(path)
+        album += 1
+    return paths
+
+
+def artist_of(path):
+    return next((part for part in path.split(os.sep) if part.startswith('Artist ')), '')
+
+
+def seed_database(db_path, file_paths, users, favorites, seed=0):
+    """Creates a fresh DB with users and favorites picked from file_paths, returns the user ids"""
+    rng = random.Random(seed)
+    con = sqlite3.connect(db_path)
+    migrate(con)
+    con.executemany('INSERT INTO user(name, login, password) VALUES (?, ?, ?)',
+                    ((f'user {i}', f'user{i}', 'password') for i in range(users)))
+    user_ids = [row[0] for row in con.execute('SELECT id FROM user ORDER BY id')]
+    for user_id in user_ids:
+        chosen = rng.sample(file_paths, min(favorites, len(file_paths)))
+        con.executemany('INSERT INTO audiofile(user_id, title, author, file_path) VALUES (?, ?, ?, ?)',
+                        ((user_id, os.path.basename(path), artist_of(path), path) for path in chosen))
+    con.commit()
+    con.close()
+    return user_ids
+
+
+def main():
+    folder = sys.argv[1]
+    tracks = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    paths = generate(folder, tracks)
+    print(f'{len(paths)} files in {folder}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+"""Benchmark suite over a synthetic library: latency percentiles and memory of every hot path.
+
+Generates a library with benchmarks.library, seeds a DB with users and favorites, then times
+the image engine, the track and artwork caches, MainWindow.update_metadata, MainWindow.open_folder
+and the DAOs. Runs headless on the offscreen Qt platform. Results can be saved as JSON per commit
+and compared with an earlier run:
+
+    py -m benchmarks.suite [--tracks N] [--users N] [--favorites N] [--save] [--compare FILE]
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from unittest import mock
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PIL import Image  # noqa: E402
+from PyQt5 import QtCore  # noqa: E402
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+import App.database  # noqa: E402
+from benchmarks.library import generate, seed_database, WORDS  # noqa: E402
+
+RESULTS_PATH = 'benchmarks/results'
+SAMPLES = 200  # calls timed per case, fewer for the slow ones
+MEMORY_SAMPLES = 20  # calls traced by tracemalloc per case, traced separately as tracing slows calls down
+
+
+def percentile(timings, share):
+    return timings[min(int(len(timings) * share), len(timings) - 1)]
+
+
+class Suite:
+    def __init__(self, app):
+        self.app = app
+        self.results = {}
+
+    def case(self, name, func, inputs, setup=None):
+        """Times func(x) for every input, then traces the peak memory of a few more calls"""
+        inputs = list(inputs)
+        if setup is not None:
+            setup()
+        timings = []
+        for item in inputs:
+            start = time.perf_counter()
+            func(item)
+            timings.append(time.perf_counter() - start)
+            self.app.processEvents()
+        timings.sort()
+
+        if setup is not None:
+            setup()
+        tracemalloc.start()
+        for item in inputs[:MEMORY_SAMPLES]:
+            func(item)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        self.app.processEvents()
+
+        result = {'calls': len(timings), 'p50': percentile(timings, 0.5) * 1000,
+                  'p90': percentile(timings, 0.9) * 1000, 'p99': percentile(timings, 0.99) * 1000,
+                  'max': timings[-1] * 1000, 'peak_kb': peak / 1024}
+        self.results[name] = result
+        print(f'{name:<34} p50 {result["p50"]:8.3f}  p90 {result["p90"]:8.3f}  p99 {result["p99"]:8.3f}  '
+              f'max {result["max"]:8.3f} ms  peak {result["peak_kb"]:8.1f} KB')
+
+
+def clear_caches(*artwork_caches):
+    """Empties the track and artwork tables and the in-memory covers of the given ArtworkCaches"""
+    con = App.database.get_connection()
+    con.execute('DELETE FROM track')
+    con.execute('DELETE FROM artwork')
+    con.commit()
+    for cache in artwork_caches:
+        with cache.lock:
+            cache.items.clear()
+
+
+def wait(app, condition):
+    while not condition():
+        app.processEvents(QtCore.QEventLoop.AllEvents | QtCore.QEventLoop.WaitForMoreEvents, 10)
+
+
+def run(suite, paths, root, user_ids):
+    from tinytag import TinyTag
+    from App.cache import ArtworkCache, TrackCache
+    from App.database import AudiofileDao, TrackDao, UserDao
+    from App.image import find_average_color, load_cover
+    from App.window import MainWindow
+
+    rng = random.Random(1)
+    sample = rng.sample(paths, min(SAMPLES, len(paths)))
+    covers = []
+    for path in paths[::12]:  # one track per album
+        image = TinyTag.get(path, image=True).get_image()
+        if image:
+            covers.append(image)
+    covers = covers[:50]
+
+    suite.case('image.find_average_color', lambda data: find_average_color(Image.open(io.BytesIO(data))), covers)
+    suite.case('image.load_cover', load_cover, covers)
+
+    track_cache = TrackCache(ArtworkCache())
+    suite.case('TrackCache.get cold', track_cache.get, sample, setup=lambda: clear_caches(track_cache.artwork_cache))
+    suite.case('TrackCache.get warm', track_cache.get, sample)
+    tracks = [track_cache.get(path) for path in sample]
+    suite.case('TrackCache.artwork warm', track_cache.artwork, tracks)
+
+    window = MainWindow(user_ids[0])
+    window.set_playlist(paths)
+    window.prefetch_neighbours = lambda: None  # a prefetched neighbour would be the next sample's warm read
+    indices = [paths.index(path) for path in sample]
+    shown = []
+    window.prefetcher.loaded.connect(lambda file_path, future: shown.append(file_path))
+
+    def show(index):
+        """Switches to a track and waits until the prefetcher has read it and the window has drawn it"""
+        window.cursor = index
+        shown.clear()
+        window.update_metadata()
+        wait(suite.app, lambda: shown)
+
+    suite.case('MainWindow.update_metadata cold', show, indices,
+               setup=lambda: clear_caches(window.track_cache.artwork_cache))
+    suite.case('MainWindow.update_metadata warm', show, indices)
+    window.stop()
+    del window.prefetch_neighbours
+
+    def open_folder(_):
+        """Opens the library through the menu action and waits until the scan has finished"""
+        with mock.patch('App.window.QFileDialog.getExistingDirectory', return_value=root):
+            window.open_folder()
+        wait(suite.app, lambda: window.scanner is None)
+        return len(window.playlist)
+
+    suite.case('MainWindow.open_folder', open_folder, range(5))
+    start = time.perf_counter()
+    files = open_folder(None)
+    suite.results['MainWindow.open_folder']['files_per_s'] = files / (time.perf_counter() - start)
+    window.stop()
+
+    audio_dao, track_dao, user_dao = AudiofileDao(), TrackDao(), UserDao()
+    user_id = user_ids[-1]
+    favorites = audio_dao.count(user_id)
+    suite.case('AudiofileDao.is_liked', lambda path: audio_dao.is_liked(user_id, path), sample)
+    suite.case('AudiofileDao.get_page', lambda offset: audio_dao.get_page(user_id, 'title', False, 200, None, offset),
+               [rng.randrange(max(favorites, 1)) for _ in range(50)])
+    suite.case('AudiofileDao.toggle', lambda path: audio_dao.toggle(user_id, 'title', 'author', path), sample[:50])
+    suite.case('AudiofileDao.count', lambda _: audio_dao.count(user_id), range(50))
+    suite.case('UserDao.get', user_dao.get, [f'user{rng.randrange(len(user_ids))}' for _ in range(100)])
+    for path in paths:
+        track_cache.get(path)
+    suite.case('TrackDao.search', lambda text: track_dao.search(text, 50),
+               [' '.join(word[:rng.randint(1, len(word))] for word in rng.sample(WORDS, rng.randint(1, 2)))
+                for _ in range(100)])
+
+
+def commit_id():
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as file:
+        baseline = json.load(file)
+    print(f'\nchange of p50 against {baseline["commit"]}:')
+    sizes = ('tracks', 'users', 'favorites')
+    if any(baseline['params'].get(key) != results['params'][key] for key in sizes):
+        print('(the baseline was run on a library of a different size)')
+    for name, result in results['cases'].items():
+        old = baseline['cases'].get(name)
+        if old is None:
+            print(f'{name:<34} new')
+            continue
+        change = (result['p50'] - old['p50']) / old['p50'] * 100 if old['p50'] else 0.0
+        print(f'{name:<34} {old["p50"]:8.3f} -> {result["p50"]:8.3f} ms  {change:+6.1f} %')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks the hot paths over a synthetic library')
+    parser.add_argument('--tracks', type=int, default=1000)
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--favorites', type=int, default=500, help='favorites per user')
+    parser.add_argument('--save', action='store_true', help=f'write the results to {RESULTS_PATH}/<commit>.json')
+    parser.add_argument('--compare', metavar='FILE', help='results of an earlier run to compare with')
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv[:1])
+    suite = Suite(app)
+    with tempfile.TemporaryDirectory() as folder:
+        root = os.path.join(folder, 'library')
+        start = time.perf_counter()
+        paths = generate(root, args.tracks)
+        App.database.db_path = os.path.join(folder, 'audioplayer.db')
+        user_ids = seed_database(App.database.db_path, paths, args.users, args.favorites)
+        print(f'generated {len(paths)} files, {len(user_ids)} users with {args.favorites} favorites '
+              f'in {time.perf_counter() - start:.1f} s\n')
+        run(suite, paths, root, user_ids)
+
+    try:
+        import resource
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB on Linux
+        print(f'\nmax RSS {max_rss:.1f} MB')
+    except ImportError:  # Windows
+        max_rss = None
+
+    results = {'commit': commit_id(), 'date': time.strftime('%Y-%m-%d %H:%M:%S'), 'python': platform.python_version(),
+               'platform': platform.platform(), 'params': vars(args), 'max_rss_mb': max_rss, 'cases': suite.results}
+    if args.save:
+        os.makedirs(RESULTS_PATH, exist_ok=True)
+        path = os.path.join(RESULTS_PATH, f'{results["commit"]}.json')
+        with open(path, 'w') as file:
+            json.dump(results, file, indent=2)
+        print(f'saved {path}')
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+import os
+import shutil
+
+import pytest
+
+import App.database
+from App.database import PlaylistDao
+from App.m3u import import_m3u, read_m3u
+
+FIXTURES_PATH = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    monkeypatch.setattr(App.database, 'db_path', str(tmp_path / 'audioplayer.db'))
+    monkeypatch.setattr(App.database, 'MIGRATIONS_PATH',
+                        os.path.join(os.path.dirname(App.database.__file__), 'resources', 'db', 'migrations'))
+    return tmp_path
+
+
+def test_read_cp1252_m3u():
+    m3u_path = os.path.join(FIXTURES_PATH, 'cp1252.m3u')
+    folder = os.path.dirname(os.path.abspath(m3u_path))
+    assert list(read_m3u(m3u_path)) == [os.path.join(folder, 'Motörhead', 'Ace.mp3'),
+                                        os.path.join(folder, 'Sigur Rós', 'Hoppípolla.mp3')]
+
+
+def test_import_cp1252_m3u(database):
+    m3u_path = str(database / 'old.m3u')
+    shutil.copy(os.path.join(FIXTURES_PATH, 'cp1252.m3u'), m3u_path)
+    playlist_id, name, count = import_m3u(1, m3u_path)
+    assert (name, count) == ('old', 2)
+    assert list(PlaylistDao().entries(playlist_id)) == [os.path.join(str(database), 'Motörhead', 'Ace.mp3'),
+                                                        os.path.join(str(database), 'Sigur Rós', 'Hoppípolla.mp3')]
+
+
+def test_read_utf8_m3u_with_bom(tmp_path):
+    m3u_path = tmp_path / 'new.m3u'
+    m3u_path.write_bytes('\ufeff#EXTM3U\nMotörhead/Ace.mp3\n'.encode('utf-8'))
+    assert list(read_m3u(str(m3u_path))) == [os.path.join(str(tmp_path), 'Motörhead', 'Ace.mp3')]
+
+
+def test_m3u8_is_strict_utf8(tmp_path):
+    m3u_path = tmp_path / 'old.m3u8'
+    shutil.copy(os.path.join(FIXTURES_PATH, 'cp1252.m3u'), m3u_path)
+    with pytest.raises(UnicodeDecodeError):
+        list(read_m3u(str(m3u_path)))